@@ -0,0 +1,32 @@
+"""
+Compare the cache codecs on a stored page of 50 films: the stored size
+against the time to encode and decode it.
+
+Run from the project directory:
+
+    python -m benchmarks.cache_codecs
+"""
+
+import orjson
+
+from benchmarks.utils import make_film, report
+from src.models import Film
+from src.services.cache import CODECS, render
+
+
+def main(page_size: int = 50) -> None:
+    films = [Film(**make_film()) for _ in range(page_size)]
+    meta = orjson.dumps({'headers': {}, 'fresh_until': 0.0, 'delta': 0.0})
+    data = meta + b'\n' + render(films)
+
+    for name, codec in CODECS.items():
+        encoded = codec.encode(data)
+        assert codec.decode(encoded) == data
+        print(f'{name}: {len(encoded)} of {len(data)} bytes '
+              f'({len(encoded) / len(data):.0%})')
+        report(f'{name} encode', lambda: codec.encode(data), number=200)
+        report(f'{name} decode', lambda: codec.decode(encoded), number=200)
+
+
+if __name__ == '__main__':
+    main()
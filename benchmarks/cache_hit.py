@@ -0,0 +1,54 @@
+"""
+Compare the cost of a redis_cache hit on a page of 50 films.
+
+The old path parsed the cached JSON into models, FastAPI validated them
+against the response model and ORJSONResponse serialized them again. The new
+path takes an entry stored by the production encoder (the codec of the
+films namespace), decodes it, parses the metadata line and returns the body
+bytes as they are.
+
+Run from the project directory:
+
+    python -m benchmarks.cache_hit
+"""
+
+import time
+
+import orjson
+import pydantic
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from benchmarks.utils import make_film, report
+from src.core.config import settings
+from src.models import Film
+from src.services.cache import (CacheEntry, decode_entry, dump_entry,
+                                encode_entry, namespace_codec, parse_entry,
+                                render)
+
+
+def main(page_size: int = 50) -> None:
+    films = [Film(**make_film()) for _ in range(page_size)]
+    entry = CacheEntry(render(films), {}, time.time() + 60, 0.01)
+    raw = encode_entry(namespace_codec(settings.ES_INDEX_MOVIES),
+                       dump_entry(entry))
+    old_raw = f"[{','.join(x.json() for x in films)}]"
+
+    def old_hit():
+        data = pydantic.parse_raw_as(list[Film], old_raw)
+        validated = pydantic.parse_obj_as(list[Film], data)
+        return ORJSONResponse(jsonable_encoder(validated, by_alias=True))
+
+    def new_hit():
+        return parse_entry(decode_entry(raw)).response()
+
+    assert orjson.loads(old_hit().body) == orjson.loads(new_hit().body)
+
+    old = report('parse + validate + serialize', old_hit, number=200)
+    new = report('decode + parse metadata + body bytes', new_hit,
+                 number=200)
+    print(f'speedup: {old / new:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare the queries of the person filmography on a synthetic catalog.
+
+The nested query matches the person in the roles of every film, the ids
+query looks up the 'film_ids' of the person document. Both return the same
+page sorted by rating.
+
+Needs a running Elasticsearch (ELASTIC_HOST, ELASTIC_PORT). Run from the
+project directory:
+
+    python -m benchmarks.person_films
+"""
+
+import asyncio
+import random
+import statistics
+import time
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+
+from benchmarks.utils import make_film
+from src.core.config import settings
+from src.services.film import FILM_SORT
+
+INDEX = 'benchmark_movies'
+ROLES = ('actors', 'directors', 'writers')
+ID_FIELD = {'type': 'nested', 'dynamic': 'strict',
+            'properties': {'id': {'type': 'keyword'},
+                           'name': {'type': 'text'}}}
+MAPPING = {
+    'dynamic': False,
+    'properties': {
+        'id': {'type': 'keyword'},
+        'imdb_rating': {'type': 'float'},
+        **{role: ID_FIELD for role in ROLES},
+    },
+}
+
+
+def make_catalog(films: int, persons: int) -> tuple[list[dict],
+                                                    dict[str, list[str]]]:
+    """
+    Return films cast from a pool of persons and the film ids of every
+    person.
+    """
+    pool = [{'id': f'person-{i}', 'name': f'Person {i}'}
+            for i in range(persons)]
+    catalog, film_ids = [], {}
+    for _ in range(films):
+        film = make_film()
+        for role, size in zip(ROLES, (10, 2, 3)):
+            film[role] = random.sample(pool, size)
+            for person in film[role]:
+                film_ids.setdefault(person['id'], []).append(film['id'])
+        catalog.append(film)
+    return catalog, film_ids
+
+
+def nested_query(person_id: str) -> dict:
+    return {'bool': {'should': [
+        {'nested': {'path': role, 'query': {'bool': {
+            'filter': {'match': {f'{role}.id': person_id}}}}}}
+        for role in ROLES
+    ]}}
+
+
+def ids_query(film_ids: list[str]) -> dict:
+    return {'ids': {'values': film_ids}}
+
+
+async def measure(es: AsyncElasticsearch, name: str,
+                  queries: list[dict]) -> float:
+    """Print and return the median time of one search in milliseconds."""
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        await es.search(index=INDEX, size=50,
+                        body={'query': query, 'sort': FILM_SORT},
+                        filter_path=['hits.hits._source'])
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings) * 1e3
+    print(f'{name:<40} {median:10.2f} ms')
+    return median
+
+
+async def main(films: int = 200_000, persons: int = 20_000,
+               samples: int = 500) -> None:
+    es = AsyncElasticsearch(
+        hosts=[f'{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}'])
+    try:
+        catalog, film_ids = make_catalog(films, persons)
+        await es.indices.delete(index=INDEX, ignore_unavailable=True)
+        await es.indices.create(index=INDEX, body={'mappings': MAPPING})
+        await async_bulk(es, ({'_index': INDEX, '_id': x['id'], '_source': x}
+                              for x in catalog))
+        await es.indices.refresh(index=INDEX)
+
+        sample = random.sample(sorted(film_ids), samples)
+        # Warm up the caches of both plans
+        await measure(es, 'warm-up', [nested_query(x) for x in sample[:50]])
+        old = await measure(es, 'nested query over the roles',
+                            [nested_query(x) for x in sample])
+        new = await measure(es, 'ids query of film_ids',
+                            [ids_query(film_ids[x]) for x in sample])
+        print(f'speedup: {old / new:.1f}x')
+    finally:
+        await es.indices.delete(index=INDEX, ignore_unavailable=True)
+        await es.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
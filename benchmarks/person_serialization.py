@@ -0,0 +1,48 @@
+"""
+Compare the serialization of a large page of persons for the cache.
+
+The old path wrote every person with `.json()` and renamed 'full_name' to
+'name' by a text replace, which also renamed it inside the values. The new
+path writes the field values by the precomputed aliases of the model.
+
+Run from the project directory:
+
+    python -m benchmarks.person_serialization
+"""
+
+import orjson
+
+from benchmarks.utils import make_person, report
+from src.models import Person, serialization
+
+
+def main(page_size: int = 100, films: int = 200) -> None:
+    persons = [Person(**make_person(films)) for _ in range(page_size)]
+
+    def old_rows():
+        return [x.json().replace('full_name', 'name') for x in persons]
+
+    def old_page():
+        return orjson.dumps(persons,
+                            default=lambda x: x.dict(by_alias=True))
+
+    def new_rows():
+        return [serialization.dumps(x) for x in persons]
+
+    def new_page():
+        return serialization.dumps(persons)
+
+    assert [orjson.loads(x) for x in old_rows()] == \
+        [orjson.loads(x) for x in new_rows()]
+    assert orjson.loads(old_page()) == orjson.loads(new_page())
+
+    old = report('rows: .json() + replace', old_rows, number=50)
+    new = report('rows: serialization.dumps', new_rows, number=50)
+    print(f'speedup: {old / new:.1f}x')
+    old = report('page: .dict(by_alias=True)', old_page, number=50)
+    new = report('page: serialization.dumps', new_page, number=50)
+    print(f'speedup: {old / new:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
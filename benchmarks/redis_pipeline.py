@@ -0,0 +1,72 @@
+"""
+Compare the throughput of concurrent cache lookups with and without the
+automatic pipelining of the Redis commands.
+
+Every simulated request reads a detail entry and the negative entry of its
+id, as ELTService does, and stores the entry on a miss.
+
+Needs a running Redis (REDIS_HOST, REDIS_PORT). Run from the project
+directory:
+
+    python -m benchmarks.redis_pipeline
+"""
+
+import asyncio
+import random
+import time
+
+import aioredis
+import orjson
+
+from benchmarks.utils import make_film
+from src.core.config import settings
+from src.services.auto_pipeline import AutoPipeline
+from src.services.cache import RedisCache
+
+PREFIX = 'benchmark'
+
+
+async def run(cache: RedisCache, ids: list[str], value: bytes,
+              requests: int, concurrency: int) -> float:
+    """Return the lookups per second of `concurrency` clients."""
+    async def client() -> None:
+        for _ in range(requests // concurrency):
+            object_id = random.choice(ids)
+            data, _ = await cache.mget(
+                [object_id, f'{PREFIX}:missing:{object_id}'])
+            if data is None:
+                await cache.set(object_id, value, expire=60)
+
+    await cache.client().delete(*ids)
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int = 50_000, concurrency: int = 200,
+               keys: int = 5_000) -> None:
+    address = (settings.REDIS_HOST, settings.REDIS_PORT)
+    ids = [f'{PREFIX}:{i}' for i in range(keys)]
+    value = orjson.dumps(make_film())
+
+    old_pool = await aioredis.create_redis_pool(address, minsize=10,
+                                                maxsize=20)
+    new_pool = await aioredis.create_redis_pool(address, minsize=2,
+                                                maxsize=10)
+    try:
+        old = await run(RedisCache(old_pool), ids, value, requests,
+                        concurrency)
+        print(f'{"pool of 10-20, one command a trip":<40} {old:10.0f} op/s')
+        new = await run(RedisCache(AutoPipeline(new_pool)), ids, value,
+                        requests, concurrency)
+        print(f'{"pool of 2-10, auto pipelining":<40} {new:10.0f} op/s')
+        print(f'speedup: {new / old:.1f}x')
+    finally:
+        await old_pool.delete(*ids)
+        for pool in (old_pool, new_pool):
+            pool.close()
+            await pool.wait_closed()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""
+Compare the per-request cost of resolving a service dependency.
+
+The old dependencies built a RedisCache and an ElasticStorage on every
+request and passed them to an lru_cache'd factory. The new objects never
+hit the cache, so every request built a service too, and the cache kept the
+last 128 of them alive. Now the services are built once at startup and the
+dependency returns the one from the application state.
+
+Run from the project directory:
+
+    python -m benchmarks.service_di
+"""
+
+import asyncio
+import time
+from functools import lru_cache
+from types import SimpleNamespace
+
+from src.services import FilmService, build_services, get_film_service
+from src.services.cache import RedisCache
+from src.services.storage import ElasticStorage
+
+
+async def measure(name: str, resolve, number: int = 100_000) -> float:
+    """Print and return the time of one resolution in microseconds."""
+    start = time.perf_counter()
+    for _ in range(number):
+        await resolve()
+    per_call = (time.perf_counter() - start) / number
+    print(f'{name:<40} {per_call * 1e6:10.2f} us')
+    return per_call
+
+
+async def main() -> None:
+    @lru_cache()
+    def old_factory(redis: RedisCache,
+                    elastic: ElasticStorage) -> FilmService:
+        return FilmService(redis, elastic)
+
+    async def get_redis_extended() -> RedisCache:
+        return RedisCache(None, None)
+
+    async def get_elastic_extended() -> ElasticStorage:
+        return ElasticStorage(None)
+
+    async def old_resolve() -> FilmService:
+        return old_factory(await get_redis_extended(),
+                           await get_elastic_extended())
+
+    app = SimpleNamespace(state=SimpleNamespace(
+        services=build_services(None, None)))
+    request = SimpleNamespace(app=app)
+
+    async def new_resolve() -> FilmService:
+        return await get_film_service(request)
+
+    old = await measure('lru_cache factory of new clients', old_resolve)
+    print(f'  live services in the cache: {old_factory.cache_info().currsize}')
+    new = await measure('service built at startup', new_resolve)
+    print(f'speedup: {old / new:.1f}x')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
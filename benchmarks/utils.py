@@ -0,0 +1,49 @@
+"""
+Synthetic data and timing helpers shared by the benchmarks.
+"""
+
+import random
+import timeit
+import uuid
+from typing import Callable
+
+
+def make_film(cast: int = 10) -> dict:
+    """Return an Elasticsearch document of a film with a random cast."""
+    def people(n: int) -> list[dict]:
+        return [{'id': str(uuid.uuid4()),
+                 'name': f'Person {uuid.uuid4().hex[:8]}'}
+                for _ in range(n)]
+
+    actors, directors, writers = people(cast), people(2), people(3)
+    return {
+        'id': str(uuid.uuid4()),
+        'title': f'Film {uuid.uuid4().hex[:12]}',
+        'description': 'A synthetic film ' * 10,
+        'imdb_rating': round(random.uniform(1, 10), 1),
+        'genre': people(3),
+        'actors': actors,
+        'directors': directors,
+        'writers': writers,
+        'actors_names': [p['name'] for p in actors],
+        'director': [p['name'] for p in directors],
+        'writers_names': [p['name'] for p in writers],
+    }
+
+
+def make_person(films: int = 10) -> dict:
+    """Return an Elasticsearch document of a person."""
+    return {
+        'id': str(uuid.uuid4()),
+        'name': f'Person {uuid.uuid4().hex[:8]}',
+        'role': random.choice(['actor', 'writer', 'director']),
+        'film_ids': [str(uuid.uuid4()) for _ in range(films)],
+    }
+
+
+def report(name: str, fn: Callable, number: int = 1000,
+           repeat: int = 5) -> float:
+    """Print and return the best time of one call in microseconds."""
+    best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    print(f'{name:<40} {best * 1e6:10.1f} us')
+    return best
@@ -0,0 +1,111 @@
+"""
+Compare the peak memory and the time of the extraction for growing result
+sets.
+
+The old path executed the query on a client-side DictCursor, so psycopg2
+held the whole result set before the first fetchmany. The new path streams
+the rows through a server-side cursor. Every run happens in a fresh process
+and reports its peak RSS and wall time.
+
+Then the keyset pages of a full reload of the movies are timed against the
+film tables of the database. A page should cost the same at any depth, a
+growing page time means the query scans the tables for every page.
+
+Needs a running PostgreSQL (the ETL settings). Run from the etl directory:
+
+    python -m benchmarks.extract_memory
+"""
+import multiprocessing
+import resource
+import time
+from contextlib import closing
+
+import psycopg2
+from psycopg2.extras import DictCursor
+
+import settings
+from extract.extract_query import EXTRACT_QUERY_FILM
+from extract.pg_extract import stream_rows
+from settings.setting_base import PG_PAGE_SIZE
+from utils import START
+
+# Rows of about the size of a film with its people
+QUERY = """
+SELECT jsonb_build_object('id', i, 'people', repeat('x', 2000))
+FROM generate_series(1, %s) i
+"""
+CHUNK = 500
+
+
+def client_side(rows: int) -> None:
+    connection = psycopg2.connect(**settings.PG, cursor_factory=DictCursor)
+    with closing(connection), closing(connection.cursor()) as cursor:
+        cursor.execute(QUERY, (rows,))
+        while cursor.fetchmany(CHUNK):
+            pass
+
+
+def server_side(rows: int) -> None:
+    with closing(psycopg2.connect(**settings.PG)) as connection:
+        for _ in stream_rows(connection, QUERY, (rows,), CHUNK):
+            pass
+
+
+def _run(target, rows: int, result: multiprocessing.Queue) -> None:
+    started = time.perf_counter()
+    target(rows)
+    seconds = time.perf_counter() - started
+    # Kilobytes on Linux
+    result.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                seconds))
+
+
+def measure(target, rows: int) -> tuple[float, float]:
+    """Return the peak RSS in megabytes and the time in seconds of the
+    extraction in a new process."""
+    result = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run,
+                                      args=(target, rows, result))
+    process.start()
+    peak = result.get()
+    process.join()
+    return peak
+
+
+def reload_pages(page_size: int = PG_PAGE_SIZE) -> list[float]:
+    """Return the time in seconds of every keyset page of a full reload
+    of the movies."""
+    times = []
+    modified, row_id = START
+    with closing(psycopg2.connect(**settings.PG)) as connection:
+        while True:
+            params = {'modified': modified, 'id': row_id, 'limit': page_size}
+            started = time.perf_counter()
+            rows = 0
+            for data in stream_rows(connection, EXTRACT_QUERY_FILM, params,
+                                    CHUNK):
+                rows += len(data)
+                _, modified, row_id = data[-1]
+            connection.commit()
+            times.append(time.perf_counter() - started)
+            if rows < page_size:
+                return times
+
+
+def main() -> None:
+    print(f'{"rows":>10} {"client-side MB":>16} {"server-side MB":>16} '
+          f'{"client-side s":>15} {"server-side s":>15}')
+    for rows in (10_000, 100_000, 500_000):
+        client_mb, client_s = measure(client_side, rows)
+        server_mb, server_s = measure(server_side, rows)
+        print(f'{rows:>10} {client_mb:>16.0f} {server_mb:>16.0f} '
+              f'{client_s:>15.2f} {server_s:>15.2f}')
+
+    times = reload_pages()
+    print(f'full reload of the movies: {len(times)} pages of '
+          f'{PG_PAGE_SIZE} rows in {sum(times):.2f} s, '
+          f'first page {times[0]:.3f} s, last page {times[-1]:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,22 @@
 """
-A PostgreSQL query for getting information about movies for loading
-into the Elasticsearch index 'movies'.
+PostgreSQL queries for getting information about movies, genres and persons
+for loading into the Elasticsearch indexes.
 
-The query retrieves only the information that has been modified AFTER
-the previous loading to Elasticsearch.
+The queries retrieve only the information that has been modified AFTER
+the previous loading to Elasticsearch. Every row is the document followed
+by its keyset position (modified, id). A query returns one page: at most
+`limit` rows right after the given position, in the order of the
+positions. The indexes of etl/migrations turn the pages into index range
+scans.
+
+EXTRACT_QUERY_FILM pages the films by their own keyset and joins the
+people and genres of the page only, it is kept for the full reloads. The
+incremental runs fan the changes out instead: the changed films, persons
+and genres are paged by their own keysets, the persons and genres are
+expanded to their films through the link tables, and only those films are
+extracted by id with EXTRACT_QUERY_FILMS_BY_ID.
 """
-EXTRACT_QUERY_FILM = """
+_FILM_DOCUMENT = """
 SELECT jsonb_build_object(
                'id', fw.id,
                'title', fw.title,
@@ -31,17 +42,28 @@ SELECT jsonb_build_object(
                            ) FILTER (WHERE g.id is not null),
                                '[]'
                    )
-           )
-FROM content.film_work fw
+           ),"""
+
+_FILM_JOINS = """\
 LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
 LEFT JOIN content.person p ON p.id = pfw.person_id
 LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
-LEFT JOIN content.genre g ON g.id = gfw.genre_id
-WHERE fw.modified > %s OR
-g.modified > %s OR
-p.modified > %s
+LEFT JOIN content.genre g ON g.id = gfw.genre_id"""
+
+EXTRACT_QUERY_FILM = _FILM_DOCUMENT + """
+       fw.modified,
+       fw.id
+FROM (
+    SELECT id
+    FROM content.film_work
+    WHERE (modified, id) > (%(modified)s::timestamptz, %(id)s::uuid)
+    ORDER BY modified, id
+    LIMIT %(limit)s
+) page
+JOIN content.film_work fw ON fw.id = page.id
+""" + _FILM_JOINS + """
 GROUP BY fw.id
-ORDER BY fw.modified;
+ORDER BY fw.modified, fw.id
 """
 
 EXTRACT_QUERY_GENRES = """
@@ -49,22 +71,85 @@ SELECT jsonb_build_object(
                'id', g.id,
                'name', g.name,
                'description', g.description
-       )
+       ),
+       g.modified,
+       g.id
 FROM content.genre g
-WHERE g.modified > %s
-ORDER BY g.modified;
+WHERE (g.modified, g.id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY g.modified, g.id
+LIMIT %(limit)s
 """
 
+# The index keeps one role per person: the first one in alphabetical order
 EXTRACT_QUERY_PERSONS = """
 SELECT jsonb_build_object(
                'id', p.id,
                'name', p.full_name,
-               'role', pfw.role,
-               'film_ids', array_agg(DISTINCT pfw.film_work_id)
-       )
+               'role', min(pfw.role),
+               'film_ids', COALESCE(
+                   array_agg(DISTINCT pfw.film_work_id)
+                   FILTER (WHERE pfw.film_work_id IS NOT NULL),
+                   '{}'
+               )
+       ),
+       p.modified,
+       p.id
+FROM (
+    SELECT id
+    FROM content.person
+    WHERE (modified, id) > (%(modified)s::timestamptz, %(id)s::uuid)
+    ORDER BY modified, id
+    LIMIT %(limit)s
+) page
+JOIN content.person p ON p.id = page.id
+LEFT JOIN content.person_film_work pfw ON pfw.person_id = p.id
+GROUP BY p.id
+ORDER BY p.modified, p.id
+"""
+
+EXTRACT_QUERY_FILMS_BY_ID = _FILM_DOCUMENT + """
+       GREATEST(fw.modified, max(p.modified), max(g.modified)) AS modified,
+       fw.id
+FROM content.film_work fw
+""" + _FILM_JOINS + """
+WHERE fw.id = ANY(%(ids)s::uuid[])
+GROUP BY fw.id
+"""
+
+# Keyset pages of the changed rows of one table, (modified, id) each
+CHANGED_FILMS = """
+SELECT fw.modified, fw.id
+FROM content.film_work fw
+WHERE (fw.modified, fw.id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY fw.modified, fw.id
+LIMIT %(limit)s
+"""
+
+CHANGED_PERSONS = """
+SELECT p.modified, p.id
 FROM content.person p
-LEFT JOIN person_film_work pfw on p.id = pfw.person_id
-WHERE p.modified > %s
-GROUP BY (p.id, pfw.role)
-ORDER BY p.modified;
+WHERE (p.modified, p.id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY p.modified, p.id
+LIMIT %(limit)s
+"""
+
+CHANGED_GENRES = """
+SELECT g.modified, g.id
+FROM content.genre g
+WHERE (g.modified, g.id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY g.modified, g.id
+LIMIT %(limit)s
+"""
+
+# Films of a batch of persons or genres, through the link tables
+FILM_IDS_BY_PERSONS = """
+SELECT DISTINCT pfw.film_work_id
+FROM content.person_film_work pfw
+WHERE pfw.person_id = ANY(%(ids)s::uuid[])
+"""
+
+FILM_IDS_BY_GENRES = """
+SELECT DISTINCT gfw.film_work_id
+FROM content.genre_film_work gfw
+WHERE gfw.genre_id = ANY(%(ids)s::uuid[])
 """
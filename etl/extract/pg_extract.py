@@ -1,85 +1,225 @@
-import datetime
+import itertools
 import logging
 from contextlib import closing
+from typing import Iterator
 
 import psycopg2
-from psycopg2.extras import DictCursor
+import psycopg2.extensions
 
 import settings
 from backoff import backoff
-from utils import JsonFileStorage, State
+from settings.setting_base import (CHECKPOINT_FILE, CHECKPOINT_FLUSH_INTERVAL,
+                                   PG_FAN_OUT_BATCH, PG_ITERSIZE,
+                                   PG_PAGE_SIZE)
+from utils import START, Checkpoint, JsonFileStorage, State
 
-from .extract_query import (EXTRACT_QUERY_FILM, EXTRACT_QUERY_GENRES,
-                            EXTRACT_QUERY_PERSONS)
+from .extract_query import (CHANGED_FILMS, CHANGED_GENRES, CHANGED_PERSONS,
+                            EXTRACT_QUERY_FILM, EXTRACT_QUERY_FILMS_BY_ID,
+                            EXTRACT_QUERY_GENRES, EXTRACT_QUERY_PERSONS,
+                            FILM_IDS_BY_GENRES, FILM_IDS_BY_PERSONS)
 
 logger = logging.getLogger(__name__)
 
 
+def stream_rows(connection: psycopg2.extensions.connection,
+                query: str,
+                params: tuple | dict,
+                chunk: int,
+                itersize: int = PG_ITERSIZE) -> Iterator[list[tuple]]:
+    """
+    Yield the rows of the query by chunks through a server-side cursor.
+
+    The server keeps the result set and sends `itersize` rows per round
+    trip, so the memory of the process does not grow with the result.
+    The rows are plain tuples.
+
+    :param connection: PostgreSQL connection, the cursor lives in its
+        transaction
+    :param query: query
+    :param params: query parameters
+    :param chunk: number of rows per yielded chunk
+    :param itersize: number of rows per round trip
+    """
+    with connection.cursor(name='etl_extract') as cursor:
+        cursor.itersize = itersize
+        cursor.execute(query, params)
+        while rows := list(itertools.islice(cursor, chunk)):
+            yield rows
+
+
 class PostgresExtractor:
     """
     A class for extracting data from a PostgreSQL database.
     """
 
-    def __init__(self, start_time: str) -> None:
-        self.state = State(JsonFileStorage('state.json'))
+    def __init__(self) -> None:
+        self.checkpoint = Checkpoint(CHECKPOINT_FILE,
+                                     CHECKPOINT_FLUSH_INTERVAL)
         self.essence = None
-        self.start_time = start_time
+        self._pending = None
         self.queries = {
             'movies': EXTRACT_QUERY_FILM,
             'persons': EXTRACT_QUERY_PERSONS,
             'genres': EXTRACT_QUERY_GENRES
         }
 
-    def _modified(self) -> str:
+    def _position(self, essence: str) -> tuple[str, str]:
         """
-        Define the last time the data was retrieved to be able
+        Define the keyset position of the last uploaded row to be able
         to update only the records that have been changed since then.
+        The runs before the checkpoints kept a time stamp in state.json.
         """
-        modified = self.state.get_state(f'pg_modified_{self.essence}')
-        if modified is None:
-            modified = datetime.datetime.min.strftime('%Y-%m-%d %H:%M:%S')
-        return modified
+        position = self.checkpoint.get(essence)
+        if position is None:
+            legacy = State(JsonFileStorage('state.json'))
+            modified = legacy.get_state(f'pg_modified_{essence}')
+            position = START if modified is None else (modified, START[1])
+        return position
 
     @backoff(exceptions=(psycopg2.OperationalError,))
-    def _connect(self) -> psycopg2.extras.DictCursor:
+    def _connect(self) -> psycopg2.extensions.connection:
         """Establish the database connection to PostgreSQL."""
-        connection = psycopg2.connect(**settings.PG, cursor_factory=DictCursor)
-        return connection.cursor()
+        return psycopg2.connect(**settings.PG)
 
     @backoff(exceptions=(AttributeError,))
-    def extract(self, essence: str, chunk: int = 100) -> list | None:
+    def extract(self, essence: str, chunk: int = 100,
+                page_size: int = PG_PAGE_SIZE) -> list | None:
         """
-        Extract and yield database data by piece. If the processing had been
-        interrupted before, yield the previously loaded data. Update the
-        state of execution.
+        Extract and yield database data by piece, starting right after the
+        last row acknowledged as uploaded. If the processing is interrupted,
+        the next run yields the unacknowledged rows again.
+
+        The rows are read by keyset pages of `page_size` rows, each page is
+        a short query that starts after the last row of the previous one.
+        The movies are reloaded in full by the joined query the first time
+        and are fanned out from the changed tables afterwards.
         """
         self.essence = essence
-        pg_state = self.state.get_state(f'pg_state_{self.essence}')
-        query = self.queries[essence]
-
-        if pg_state is not None:
-            yield pg_state
         try:
-            with closing(self._connect()) as pg_cursor:
-                params = (
-                    (self._modified(),) * 3
-                    if essence == 'movies'
-                    else (self._modified(),)
-                )
-                pg_cursor.execute(query, params)
-
-                while data := pg_cursor.fetchmany(chunk):
-                    self.state.set_state(f'pg_state_{self.essence}', data)
-                    self.state.set_state(f'pg_modified_{self.essence}', self.start_time)
-                    logger.info("Extracted {} data from PostgreSQL".format(essence))
-
-                    yield data
-
-                    self.state.set_state(f'pg_state_{self.essence}', None)
-                self.state.set_state(f'pg_state_{self.essence}', None)
+            with closing(self._connect()) as connection:
+                if essence == 'movies' and self._position(essence) != START:
+                    yield from self._fan_out(connection, chunk)
+                else:
+                    if essence == 'movies':
+                        self._start_reload(connection)
+                    yield from self._pages(connection, essence,
+                                           self.queries[essence], chunk,
+                                           page_size)
         except AttributeError as e:
             logger.exception('Can\'t close the database connection.'
                              'Seems that the database connection is'
                              'no longer functioning: {}'.format(e))
         except Exception as e:
             logger.exception('ERROR: {}'.format(e))
+        finally:
+            self.checkpoint.flush()
+
+    def _start_reload(self,
+                      connection: psycopg2.extensions.connection) -> None:
+        """
+        Start the fan-out of the persons and genres at the start of a full
+        reload of the movies: the reload reads the earlier changes itself.
+        """
+        (now,), = self._fetch(connection, 'SELECT now()', {})
+        for essence in ('movies.persons', 'movies.genres'):
+            self.checkpoint.advance(essence, now, START[1])
+
+    def _pages(self, connection: psycopg2.extensions.connection,
+               essence: str, query: str, chunk: int,
+               page_size: int) -> Iterator[list[tuple]]:
+        """Yield the documents of the query page by page."""
+        modified, row_id = self._position(essence)
+        while True:
+            params = {'modified': modified, 'id': row_id, 'limit': page_size}
+            rows = 0
+            for data in stream_rows(connection, query, params, chunk):
+                logger.info(
+                    "Extracted {} data from PostgreSQL".format(essence))
+                rows += len(data)
+                _, modified, row_id = data[-1]
+                self._pending = (essence, modified, row_id)
+                yield data
+            # End the transaction of the page
+            connection.commit()
+            if rows < page_size:
+                break
+
+    def _fan_out(self, connection: psycopg2.extensions.connection,
+                 chunk: int,
+                 batch: int = PG_FAN_OUT_BATCH) -> Iterator[list[tuple]]:
+        """
+        Yield the films affected by the changes since the last run in three
+        stages: find the changed films, persons and genres by their own
+        keysets, expand the persons and genres to their films through the
+        link tables, and extract only those films by id.
+
+        Each stage keeps its own position. The films are paged by the same
+        keyset as the full reload, so an interrupted reload goes on here.
+        The stages of the persons and genres start at the start of the full
+        reload, or where the movies were after an upgrade from the joined
+        query, whose position was the latest change of a film, its people
+        and its genres.
+        """
+        start = self._position('movies')
+        stages = (
+            ('movies', CHANGED_FILMS, None),
+            ('movies.persons', CHANGED_PERSONS, FILM_IDS_BY_PERSONS),
+            ('movies.genres', CHANGED_GENRES, FILM_IDS_BY_GENRES),
+        )
+        for essence, changed, expand in stages:
+            modified, row_id = (self.checkpoint.get(essence)
+                                or (start[0], START[1]))
+            while True:
+                params = {'modified': modified, 'id': row_id, 'limit': batch}
+                ids = self._fetch(connection, changed, params)
+                if not ids:
+                    break
+                modified, row_id = ids[-1]
+                film_ids = [row[-1] for row in ids]
+                if expand is not None:
+                    film_ids = [row[0] for row in self._fetch(
+                        connection, expand, {'ids': film_ids})]
+                logger.info("Fanned out {} changed {} to {} movies".format(
+                    len(ids), essence, len(film_ids)))
+                yield from self._films(connection, film_ids, chunk,
+                                       (essence, modified, row_id))
+                # End the transaction of the batch
+                connection.commit()
+                if len(ids) < batch:
+                    break
+
+    def _films(self, connection: psycopg2.extensions.connection,
+               film_ids: list, chunk: int,
+               position: tuple) -> Iterator[list[tuple]]:
+        """
+        Yield the documents of the films by chunks of `chunk` ids. The
+        position is acknowledged with the last chunk only, an empty chunk
+        if there is no film.
+        """
+        self._pending = None
+        for i in range(0, len(film_ids), chunk):
+            data = self._fetch(connection, EXTRACT_QUERY_FILMS_BY_ID,
+                               {'ids': film_ids[i:i + chunk]})
+            if i + chunk >= len(film_ids):
+                self._pending = position
+            yield data
+        if not film_ids:
+            self._pending = position
+            yield []
+
+    @staticmethod
+    def _fetch(connection: psycopg2.extensions.connection,
+               query: str, params: dict) -> list[tuple]:
+        """Return all the rows of a bounded query."""
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def acknowledge(self) -> None:
+        """
+        Record that the last yielded chunk has been uploaded, so that the
+        extraction resumes after the rows it came from.
+        """
+        if self._pending is not None:
+            self.checkpoint.advance(*self._pending)
+            self._pending = None
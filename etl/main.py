@@ -6,6 +6,7 @@ import logging
 import sys
 import time
 
+import settings
 import transform
 import upload
 from extract import PostgresExtractor
@@ -28,17 +29,25 @@ class PostgresToElastic:
     """
 
     @staticmethod
-    def process_data(start_time: str) -> None:
+    def process_data() -> None:
         """Run the process."""
-        extractor = PostgresExtractor(start_time)
+        extractor = PostgresExtractor()
+        publisher = upload.ChangePublisher()
         for index, index_mapper in upload.EST_INDEXES.items():
             transformer = transform.Transform(index)
             loader = upload.ElasticsearchLoader(index)
-            for raw_data in extractor.extract(index):
-                for row in raw_data:
-                    obj = transformer.transform(row)
-                    logger.info(obj)
-                    loader.upload_data(obj)
+            loader.check_index()
+            for raw_data in extractor.extract(
+                    index, chunk=settings.EST['bulk_chunk_size']):
+                docs = [transformer.transform(row) for row in raw_data]
+                uploaded = loader.upload_data(docs)
+                if uploaded is None:
+                    # Elasticsearch is unavailable, resume from this chunk
+                    break
+                publisher.publish(index, uploaded)
+                extractor.acknowledge()
+            # Drop the lists and searches once the index is loaded
+            publisher.bump_generation(index)
 
 
 def main_func():
@@ -46,7 +55,7 @@ def main_func():
     pg_to_es = PostgresToElastic()
     while True:
         start_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        pg_to_es.process_data(start_time)
+        pg_to_es.process_data()
         logger.info("Last time update Elasticsearch indexes - {}".format(start_time))
         time.sleep(DELAY)
 
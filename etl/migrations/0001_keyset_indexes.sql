@@ -0,0 +1,16 @@
+-- Indexes of the keyset pages of the ETL extraction:
+--     WHERE (modified, id) > (%s, %s) ORDER BY modified, id LIMIT n
+-- turns into a range scan of the index that stops after n entries.
+--
+-- CONCURRENTLY does not lock the tables for writes, so the migration runs
+-- outside of a transaction:
+--     psql -d movies_database -f etl/migrations/0001_keyset_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS film_work_modified_id_idx
+    ON content.film_work (modified, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS person_modified_id_idx
+    ON content.person (modified, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS genre_modified_id_idx
+    ON content.genre (modified, id);
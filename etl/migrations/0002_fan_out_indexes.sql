@@ -0,0 +1,14 @@
+-- Indexes of the change fan-out of the ETL extraction: the changed persons
+-- and genres are expanded to their films with
+--     SELECT DISTINCT film_work_id FROM ... WHERE person_id = ANY(%s)
+-- which becomes an index-only scan of the link table.
+--
+-- CONCURRENTLY does not lock the tables for writes, so the migration runs
+-- outside of a transaction:
+--     psql -d movies_database -f etl/migrations/0002_fan_out_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS person_film_work_person_film_idx
+    ON content.person_film_work (person_id, film_work_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS genre_film_work_genre_film_idx
+    ON content.genre_film_work (genre_id, film_work_id);
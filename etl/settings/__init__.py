@@ -1,7 +1,9 @@
 __all__ = [
     'EST',
-    'PG'
+    'PG',
+    'REDIS',
 ]
 
 from .settings_file import EST
 from .settings_file import PG
+from .settings_file import REDIS
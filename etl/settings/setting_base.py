@@ -1 +1,12 @@
+import os
+
 DELAY = 60
+# Rows per round trip of the server-side cursor of the extractor
+PG_ITERSIZE = int(os.environ.get('PG_ITERSIZE', 2000))
+# Rows per keyset page of the extraction, one query each
+PG_PAGE_SIZE = int(os.environ.get('PG_PAGE_SIZE', 10000))
+# Changed persons or genres expanded to their films per query
+PG_FAN_OUT_BATCH = int(os.environ.get('PG_FAN_OUT_BATCH', 1000))
+# Keyset positions of the extraction, written at most this often
+CHECKPOINT_FILE = os.environ.get('ETL_CHECKPOINT_FILE', 'checkpoint.json')
+CHECKPOINT_FLUSH_INTERVAL = 5
@@ -23,6 +23,19 @@ class ESTSettings(pydantic.BaseSettings):
     """Elasticsearc settings."""
     es_host: str = os.environ.get('ELASTIC_HOST')
     es_port: str = os.environ.get('ELASTIC_PORT')
+    # A bulk request ends at whichever limit comes first
+    bulk_chunk_size: int = int(os.environ.get('ES_BULK_CHUNK_SIZE', 500))
+    bulk_max_bytes: int = int(os.environ.get('ES_BULK_MAX_BYTES',
+                                             10 * 1024 * 1024))
+
+
+class RedisSettings(pydantic.BaseSettings):
+    """Redis settings of the API cache."""
+    host: str = os.environ.get('REDIS_HOST', 'localhost')
+    port: int = int(os.environ.get('REDIS_PORT', 6379))
+    key_prefix: str = os.environ.get('CACHE_KEY_PREFIX', 'cinema')
+    changes_channel: str = os.environ.get('CACHE_CHANGES_CHANNEL',
+                                          'cinema:changes')
 
 
 PG = PGSettings(
@@ -30,3 +43,4 @@ PG = PGSettings(
     password=os.environ.get('POSTGRES_PASSWORD')
 ).dict()
 EST = ESTSettings().dict()
+REDIS = RedisSettings().dict()
@@ -25,7 +25,7 @@ class Transform:
         """Transform data in accordance with the Pydantic models."""
         people = parse_obj_as(list[Person],
                               item[0]['people'])
-        film = parse_obj_as(list[Filmwork], item)[0]
+        film = parse_obj_as(Filmwork, item[0])
 
         actors_ = [p for p in people if p.role == 'actor']
         writers_ = [p for p in people if p.role == 'writer']
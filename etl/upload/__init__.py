@@ -1,7 +1,9 @@
 __all__ = [
+    'ChangePublisher',
     'ElasticsearchLoader',
     'EST_INDEXES',
 ]
 
+from .change_events import ChangePublisher
 from .es_upload import ElasticsearchLoader
 from .es_schema import EST_INDEXES
@@ -0,0 +1,66 @@
+import json
+import logging
+import time
+import uuid
+
+import redis
+
+import settings
+from backoff import backoff
+
+logger = logging.getLogger(__name__)
+
+
+class ChangePublisher:
+    """
+    Tell the API which documents have changed, so that it drops their cache
+    entries instead of waiting for the TTL.
+
+    The documents are dropped chunk by chunk. The lists and searches of an
+    index are dropped once per ETL cycle, by a new change generation of the
+    index, so that a large load does not empty them after every chunk.
+    """
+
+    def __init__(self) -> None:
+        self.redis = redis.Redis(host=settings.REDIS['host'],
+                                 port=settings.REDIS['port'])
+        self.prefix = settings.REDIS['key_prefix']
+        self.changed: set[str] = set()
+
+    @backoff(exceptions=(redis.exceptions.ConnectionError,))
+    def publish(self, index: str, ids: list[str]) -> None:
+        """
+        Drop the cached documents and publish the change event of the ids.
+
+        The keys are the ones of ELTService in the API: the document under
+        its id and the negative entry of the id.
+        """
+        if not ids:
+            return
+        self.redis.delete(*ids,
+                          *(f'{self.prefix}:missing:{index}:{x}' for x in ids))
+        self._send({'index': index, 'ids': ids})
+        self.changed.add(index)
+        logger.info(f'Published {len(ids)} changes of {index}.')
+
+    @backoff(exceptions=(redis.exceptions.ConnectionError,))
+    def bump_generation(self, index: str) -> None:
+        """
+        Set a new change generation of the index if any of its documents
+        have changed since the last one, and publish it.
+
+        The generation is a time stamp, so it keeps growing even if Redis
+        loses the stored one.
+        """
+        if index not in self.changed:
+            return
+        generation = time.time_ns() // 1000
+        self.redis.hset(f'{self.prefix}:generations', index, generation)
+        self._send({'index': index, 'ids': [], 'generation': generation})
+        self.changed.discard(index)
+        logger.info(f'Set generation {generation} of {index}.')
+
+    def _send(self, event: dict) -> None:
+        event = {'event_id': uuid.uuid4().hex, **event}
+        self.redis.publish(settings.REDIS['changes_channel'],
+                           json.dumps(event))
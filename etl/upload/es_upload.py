@@ -1,12 +1,13 @@
 import http
 import logging
+from typing import Sequence
 
 import elasticsearch
 import elasticsearch.helpers
+from pydantic import BaseModel
 
 import settings
 from backoff import backoff
-from transform import Filmwork
 
 from .es_schema import EST_INDEXES
 
@@ -24,18 +25,37 @@ class ElasticsearchLoader:
         self.index = index
 
     @backoff(exceptions=(elasticsearch.exceptions.ConnectionError,))
-    def upload_data(self, data: list[Filmwork]) -> None:
-        """Upload the data to the index."""
-        self.check_index()
-
-        query = [{'_index': self.index, '_id': data.id, '_source': dict(data)}]
-        rows_count, errors = elasticsearch.helpers.bulk(self.es, query)
-
-        if errors:
-            logger.exception(f'Elasticsearch uploading error: {errors}'
-                             f'while executing query {query}.')
-        else:
-            logger.info(f'Successfully uploaded {rows_count} rows.')
+    def upload_data(self, data: Sequence[BaseModel]) -> list[str]:
+        """
+        Upload the documents to the index in bulk requests and return the
+        ids of the uploaded ones.
+
+        The bulk requests are cut by the number of documents and by bytes.
+        A document rejected by Elasticsearch is logged and skipped, the
+        others are uploaded anyway. The documents are a sequence, so that a
+        retry after a lost connection sends them again.
+        """
+        actions = ({'_index': self.index, '_id': doc.id, '_source': dict(doc)}
+                   for doc in data)
+        uploaded, failed = [], 0
+        for ok, item in elasticsearch.helpers.streaming_bulk(
+                self.es, actions,
+                chunk_size=settings.EST['bulk_chunk_size'],
+                max_chunk_bytes=settings.EST['bulk_max_bytes'],
+                raise_on_error=False,
+                # Retry the documents rejected by a full queue (429)
+                max_retries=3,
+        ):
+            result = item['index']
+            if ok:
+                uploaded.append(result['_id'])
+                continue
+            failed += 1
+            logger.error(f"Failed to upload {result['_id']} to {self.index}: "
+                         f"{result.get('status')} {result.get('error')}")
+        logger.info(f'Uploaded {len(uploaded)} documents to {self.index}, '
+                    f'{failed} failed.')
+        return uploaded
 
     @backoff(exceptions=(elasticsearch.exceptions.ConnectionError,))
     def check_index(self):
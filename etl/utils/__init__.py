@@ -1,7 +1,11 @@
-_all__ = [
+__all__ = [
+    'Checkpoint',
     'JsonFileStorage',
+    'START',
     'State'
 ]
 
+from .checkpoint import START
+from .checkpoint import Checkpoint
 from .state import JsonFileStorage
 from .state import State
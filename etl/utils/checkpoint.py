@@ -0,0 +1,60 @@
+import json
+import os
+import time
+from typing import Any
+
+# The keyset position before all the rows
+START = ('0001-01-01T00:00:00+00:00', '00000000-0000-0000-0000-000000000000')
+
+
+class Checkpoint:
+    """
+    Keyset positions of the extraction: the (modified, id) of the last row
+    acknowledged as uploaded, per entity.
+
+    The positions are kept in memory and written to the file at most once
+    per `flush_interval` seconds, atomically: a temporary file replaces the
+    previous one, so a crash leaves either the old or the new positions.
+    A lost update only makes the next run upload some rows again.
+    """
+
+    def __init__(self, file_path: str, flush_interval: float = 5) -> None:
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+        self._positions = self._load()
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+
+    def get(self, essence: str) -> tuple[str, str] | None:
+        """Return the position of the entity, None if there is none."""
+        position = self._positions.get(essence)
+        return None if position is None else tuple(position)
+
+    def advance(self, essence: str, modified: Any, row_id: str) -> None:
+        """Move the entity past the row and flush if it is due."""
+        if isinstance(modified, str):
+            self._positions[essence] = [modified, str(row_id)]
+        else:
+            self._positions[essence] = [modified.isoformat(), str(row_id)]
+        self._dirty = True
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the positions to the file if they have changed."""
+        if self._dirty:
+            tmp_path = f'{self.file_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as tmp_file:
+                json.dump(self._positions, tmp_file)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, self.file_path)
+            self._dirty = False
+        self._flushed_at = time.monotonic()
+
+    def _load(self) -> dict[str, list[str]]:
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return {}
@@ -1,14 +1,20 @@
+import asyncio
+import http
 import logging
+import os
 
 import aioredis
 from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
 
-from src.api.v1 import films, genres, persons
+from src.api.v1 import films, genres, persons, stats, warmup
 from src.core.config import settings
 from src.core.logger import LOGGING
 from src.db import elastic, redis
+from src.services import bloom, build_services, cache, changes, telemetry
+from src.services.auto_pipeline import AutoPipeline
+from src.services.pagination import PaginationError
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -28,16 +34,74 @@ async def startup() -> None:
     :return:
     """
     redis.redis = await aioredis.create_redis_pool(
-        (settings.REDIS_HOST, settings.REDIS_PORT), minsize=10, maxsize=20
+        (settings.REDIS_HOST, settings.REDIS_PORT),
+        minsize=settings.REDIS_POOL_MINSIZE,
+        maxsize=settings.REDIS_POOL_MAXSIZE,
     )
+    if settings.REDIS_AUTO_PIPELINE:
+        redis.redis = AutoPipeline(redis.redis)
     elastic.es = AsyncElasticsearch(
-        hosts=[f'{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}']
+        hosts=[f'{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}'],
+        serializer=elastic.OrjsonSerializer(),
     )
+    if settings.LOCAL_CACHE_ENABLED:
+        cache.local_cache = cache.LocalCache(
+            max_items=settings.LOCAL_CACHE_MAX_ITEMS,
+            max_bytes=settings.LOCAL_CACHE_MAX_BYTES,
+            ttl=settings.LOCAL_CACHE_EXPIRE_IN_SECONDS,
+        )
+    app.state.services = build_services(redis.redis, elastic.es,
+                                        cache.local_cache)
+    await changes.load_generations(redis.redis, cache.local_cache)
+
+    # Pub/sub needs a dedicated connection
+    app.state.events_redis = await aioredis.create_redis(
+        (settings.REDIS_HOST, settings.REDIS_PORT)
+    )
+    changes_channel, = await app.state.events_redis.subscribe(
+        settings.CACHE_CHANGES_CHANNEL
+    )
+    app.state.background_tasks = [
+        asyncio.create_task(
+            changes.listen_changes(changes_channel, cache.local_cache)
+        ),
+        asyncio.create_task(
+            changes.sync_generations(redis.redis, cache.local_cache)
+        ),
+        asyncio.create_task(
+            telemetry.flush_access_counts(redis.redis, cache.local_cache)
+        ),
+    ]
+    if settings.BLOOM_FILTER_ENABLED:
+        app.state.background_tasks.append(asyncio.create_task(
+            bloom.maintain_filters(
+                redis.redis, elastic.es,
+                [settings.ES_INDEX_MOVIES, settings.ES_INDEX_PERSONS,
+                 settings.ES_INDEX_GENRES],
+            )
+        ))
+    if settings.WARMUP_ENABLED:
+        app.state.background_tasks.append(asyncio.create_task(
+            warmup.keep_warm(redis.redis, elastic.es, cache.local_cache)
+        ))
+
+
+@app.exception_handler(PaginationError)
+async def pagination_error_handler(request: Request,
+                                   exc: PaginationError) -> ORJSONResponse:
+    """Respond with Bad Request to a page that cannot be served."""
+    return ORJSONResponse(status_code=http.HTTPStatus.BAD_REQUEST,
+                          content={'detail': str(exc)})
 
 
 @app.on_event('shutdown')
 async def shutdown():
     """ Отключаемся от баз при выключении сервера."""
+    for task in app.state.background_tasks:
+        task.cancel()
+    await telemetry.access_counter.flush(redis.redis)
+    app.state.events_redis.close()
+    await app.state.events_redis.wait_closed()
     redis.redis.close()
     await redis.redis.wait_closed()
     await elastic.es.close()
@@ -46,6 +110,7 @@ async def shutdown():
 app.include_router(films.router, prefix='/api/v1/films', tags=['films'])
 app.include_router(genres.router, prefix='/api/v1/genres', tags=['genres'])
 app.include_router(persons.router, prefix='/api/v1/persons', tags=['persons'])
+app.include_router(stats.router, prefix='/api/v1/stats', tags=['stats'])
 
 if __name__ == '__main__' and os.getenv('DEBUG') == 'True':
     import uvicorn
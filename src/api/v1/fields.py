@@ -0,0 +1,46 @@
+"""
+The module contains the 'fields' query parameter for sparse fieldsets.
+"""
+from http import HTTPStatus
+from typing import Callable
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+from src.models.fields import response_fields
+
+
+def sparse_fields(model: type[BaseModel]
+                  ) -> Callable[[str | None], tuple[str, ...] | None]:
+    """
+    Return a dependency that parses a comma separated list of the model
+    fields. The id is always returned.
+
+    The fields are returned in the model order, so the same set of fields
+    gives the same cache key in any order.
+
+    :param model: response model
+    :return: FastAPI dependency
+    """
+    allowed = response_fields(model)
+
+    def dependency(
+            fields: str | None = Query(
+                None,
+                description=f'Comma separated fields to return: '
+                            f'{", ".join(allowed)}',
+            ),
+    ) -> tuple[str, ...] | None:
+        if fields is None:
+            return None
+        requested = {name.strip() for name in fields.split(',')} - {''}
+        unknown = requested - set(allowed)
+        if unknown:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail=f'Unknown fields: {", ".join(sorted(unknown))}',
+            )
+        requested.add('id')
+        return tuple(name for name in allowed if name in requested)
+
+    return dependency
@@ -4,12 +4,16 @@ about Films from Elasticsearch.
 """
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 
+from src.api.v1.fields import sparse_fields
+from src.api.v1.search import search_query
 from src.core.config import settings
-from src.db.redis import redis_cache
 from src.models import Film
+from src.models.fields import project
 from src.services import FilmService, get_film_service
+from src.services.cache import json_response, page_response, redis_cache
+from src.services.pagination import CURSOR_DESCRIPTION
 
 router = APIRouter()
 
@@ -21,22 +25,31 @@ router = APIRouter()
             )
 @redis_cache(
     model=Film,
-    expired=settings.CACHE_EXPIRE_IN_SECONDS
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_MOVIES,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    normalize='service',
 )
 async def get_films_list(
         request: Request,
-        page_size: int = Query(50, alias="page[size]", ge=1),
+        page_size: int = Query(50, alias="page[size]", ge=1,
+                               le=settings.MAX_PAGE_SIZE),
         page_number: int = Query(1, alias="page[number]", ge=1),
+        cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Film)),
         service: FilmService = Depends(get_film_service)
 ) -> list[Film]:
     """
     GET a list of films according to the specified page size and number
     of items in a list.
     """
-    res = await service.get_many(str(request.url),
-                                 page_size,
-                                 page_number)
-    return res
+    page = await service.get_many(str(request.url),
+                                  page_size,
+                                  page_number,
+                                  cursor,
+                                  fields)
+    return page_response(page)
 
 
 @router.get('/{film_id}',
@@ -46,11 +59,16 @@ async def get_films_list(
             )
 @redis_cache(
     model=Film,
-    expired=settings.CACHE_EXPIRE_IN_SECONDS
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_MOVIES,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    track='film_id',
 )
 async def get_object_by_id(
         request: Request,
         film_id: str,
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Film)),
         service: FilmService = Depends(get_film_service)
 ) -> list[Film]:
     """
@@ -63,7 +81,29 @@ async def get_object_by_id(
     if not res:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
                             detail=f'Film with id {film_id} not found')
-    return res
+    return project(res, fields) if fields else res
+
+
+@router.post('/batch',
+             response_model=list[Film],
+             summary="Get films by ids",
+             response_description="Return films",
+             )
+async def get_objects_by_ids(
+        ids: list[str] = Body(..., embed=True, min_items=1,
+                              max_items=settings.MAX_BATCH_SIZE),
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Film)),
+        service: FilmService = Depends(get_film_service)
+) -> list[Film]:
+    """
+    Get films by ids. Unknown ids are skipped.
+
+    Examples:
+    >>> POST http://127.0.0.1:8000/api/v1/films/batch {"ids": ["..."]}
+    """
+    items = await service.get_many_by_ids(ids)
+    return json_response([project(x, fields) for x in items]
+                         if fields else items)
 
 
 @router.get('/search/',
@@ -71,10 +111,23 @@ async def get_object_by_id(
             summary="Search film",
             response_description="Return films",
             )
+@redis_cache(
+    model=Film,
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_MOVIES,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    admit_after=settings.SEARCH_CACHE_ADMIT_AFTER,
+    normalize='service',
+)
 async def get_query(
-        query: str | None,
-        page_size: int = Query(default=50, alias="page[size]"),
-        page_number: int = Query(default=1, alias="page[number]"),
+        request: Request,
+        query: str = Depends(search_query),
+        page_size: int = Query(default=50, alias="page[size]", ge=1,
+                               le=settings.MAX_PAGE_SIZE),
+        page_number: int = Query(default=1, alias="page[number]", ge=1),
+        cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Film)),
         service: FilmService = Depends(get_film_service)
 ) -> list[Film]:
     """
@@ -83,5 +136,7 @@ async def get_query(
     Examples:
     >>> http://127.0.0.1:8000/api/v1/films/search/?query=star
     """
-    res = await service.search(query=query, page_size=page_size, page_number=page_number)
-    return res
+    page = await service.search(query=query, page_size=page_size,
+                                page_number=page_number, cursor=cursor,
+                                fields=fields)
+    return page_response(page)
@@ -4,12 +4,13 @@ Genres Film from Elasticsearch.
 """
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 
 from src.core.config import settings
-from src.db.redis import redis_cache
 from src.models import Genre
 from src.services import GenreService, get_genre_service
+from src.services.cache import json_response, page_response, redis_cache
+from src.services.pagination import CURSOR_DESCRIPTION
 
 router = APIRouter()
 
@@ -21,22 +22,29 @@ router = APIRouter()
             )
 @redis_cache(
     model=Genre,
-    expired=settings.CACHE_EXPIRE_IN_SECONDS
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_GENRES,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    normalize='service',
 )
 async def get_genres_list(
         request: Request,
-        page_size: int = Query(50, alias="page[size]", ge=1),
+        page_size: int = Query(50, alias="page[size]", ge=1,
+                               le=settings.MAX_PAGE_SIZE),
         page_number: int = Query(1, alias="page[number]", ge=1),
+        cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
         service: GenreService = Depends(get_genre_service)
 ) -> list[Genre]:
     """
     GET a list of genres according to the specified page size and number
     of items in a list.
     """
-    res = await service.get_many(str(request.url),
-                                 page_size,
-                                 page_number)
-    return res
+    page = await service.get_many(str(request.url),
+                                  page_size,
+                                  page_number,
+                                  cursor)
+    return page_response(page)
 
 
 @router.get('/{genre_id}',
@@ -46,7 +54,11 @@ async def get_genres_list(
             )
 @redis_cache(
     model=Genre,
-    expired=settings.CACHE_EXPIRE_IN_SECONDS
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_GENRES,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    track='genre_id',
 )
 async def get_object_by_id(
         request: Request,
@@ -64,3 +76,23 @@ async def get_object_by_id(
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
                             detail=f'Genre with id {genre_id} not found')
     return res
+
+
+@router.post('/batch',
+             response_model=list[Genre],
+             summary="Get genres by ids",
+             response_description="Return genres",
+             )
+async def get_objects_by_ids(
+        ids: list[str] = Body(..., embed=True, min_items=1,
+                              max_items=settings.MAX_BATCH_SIZE),
+        service: GenreService = Depends(get_genre_service)
+) -> list[Genre]:
+    """
+    Get genres by ids. Unknown ids are skipped.
+
+    Examples:
+    >>> POST http://127.0.0.1:8000/api/v1/genres/batch {"ids": ["..."]}
+    """
+    items = await service.get_many_by_ids(ids)
+    return json_response(items)
@@ -4,12 +4,17 @@ Writers and Directors from Elasticsearch.
 """
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 
+from src.api.v1.fields import sparse_fields
+from src.api.v1.search import search_query
 from src.core.config import settings
-from src.db.redis import redis_cache
 from src.models import Film, Person
-from src.services import PersonService, get_person_service
+from src.models.fields import project
+from src.services import (FilmService, PersonService, get_film_service,
+                          get_person_service)
+from src.services.cache import json_response, page_response, redis_cache
+from src.services.pagination import CURSOR_DESCRIPTION
 
 router = APIRouter()
 
@@ -21,22 +26,31 @@ router = APIRouter()
             )
 @redis_cache(
     model=Person,
-    expired=settings.CACHE_EXPIRE_IN_SECONDS
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_PERSONS,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    normalize='service',
 )
 async def get_persons_list(
         request: Request,
-        page_size: int = Query(50, alias="page[size]", ge=1),
+        page_size: int = Query(50, alias="page[size]", ge=1,
+                               le=settings.MAX_PAGE_SIZE),
         page_number: int = Query(1, alias="page[number]", ge=1),
+        cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Person)),
         service: PersonService = Depends(get_person_service)
 ) -> list[Person]:
     """
     GET a list of persons according to the specified page size and number
     of items in a list.
     """
-    res = await service.get_many(str(request.url),
-                                 page_size,
-                                 page_number)
-    return res
+    page = await service.get_many(str(request.url),
+                                  page_size,
+                                  page_number,
+                                  cursor,
+                                  fields)
+    return page_response(page)
 
 
 @router.get('/{person_id}',
@@ -46,11 +60,16 @@ async def get_persons_list(
             )
 @redis_cache(
     model=Person,
-    expired=settings.CACHE_EXPIRE_IN_SECONDS
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_PERSONS,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    track='person_id',
 )
 async def get_object_by_id(
         request: Request,
         person_id: str,
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Person)),
         service: PersonService = Depends(get_person_service)
 ) -> list[Person]:
     """
@@ -63,7 +82,29 @@ async def get_object_by_id(
     if not res:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND,
                             detail=f'Person with id {person_id} not found')
-    return res
+    return project(res, fields) if fields else res
+
+
+@router.post('/batch',
+             response_model=list[Person],
+             summary="Get persons by ids",
+             response_description="Return persons",
+             )
+async def get_objects_by_ids(
+        ids: list[str] = Body(..., embed=True, min_items=1,
+                              max_items=settings.MAX_BATCH_SIZE),
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Person)),
+        service: PersonService = Depends(get_person_service)
+) -> list[Person]:
+    """
+    Get persons by ids. Unknown ids are skipped.
+
+    Examples:
+    >>> POST http://127.0.0.1:8000/api/v1/persons/batch {"ids": ["..."]}
+    """
+    items = await service.get_many_by_ids(ids)
+    return json_response([project(x, fields) for x in items]
+                         if fields else items)
 
 
 @router.get('/{person_id}/film/',
@@ -73,14 +114,22 @@ async def get_object_by_id(
             )
 @redis_cache(
     model=Film,
-    expired=settings.CACHE_EXPIRE_IN_SECONDS
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_MOVIES,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    normalize='film_service',
 )
 async def person_films(
         request: Request,
         person_id: str,
-        page_size: int = Query(50, alias="page[size]"),
-        page_number: int = Query(1, alias="page[number]"),
-        person_service: PersonService = Depends(get_person_service)
+        page_size: int = Query(50, alias="page[size]", ge=1,
+                               le=settings.MAX_PAGE_SIZE),
+        page_number: int = Query(1, alias="page[number]", ge=1),
+        cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Film)),
+        person_service: PersonService = Depends(get_person_service),
+        film_service: FilmService = Depends(get_film_service),
 ) -> list[Film]:
     """
     Get person's films
@@ -88,10 +137,10 @@ async def person_films(
     Examples:
     >>> http://127.0.0.1:8000/api/v1/persons/5bb0dd2c-3aff-4a2f-92f7-8cda3eb01ab0/film/
     """
-    films = await person_service.get_films_by_person(
-        person_id, page_size, page_number
+    page = await person_service.get_films_by_person(
+        person_id, page_size, page_number, cursor, fields
     )
-    return films
+    return page_response(page)
 
 
 @router.get('/search/',
@@ -99,10 +148,23 @@ async def person_films(
             summary="Search person",
             response_description="Return persons",
             )
+@redis_cache(
+    model=Person,
+    expired=settings.CACHE_EXPIRE_IN_SECONDS,
+    namespace=settings.ES_INDEX_PERSONS,
+    stale=settings.CACHE_STALE_IN_SECONDS,
+    early_refresh=settings.CACHE_EARLY_REFRESH_BETA,
+    admit_after=settings.SEARCH_CACHE_ADMIT_AFTER,
+    normalize='service',
+)
 async def get_query(
-        query: str | None,
-        page_size: int = Query(default=50, alias="page[size]"),
-        page_number: int = Query(default=1, alias="page[number]"),
+        request: Request,
+        query: str = Depends(search_query),
+        page_size: int = Query(default=50, alias="page[size]", ge=1,
+                               le=settings.MAX_PAGE_SIZE),
+        page_number: int = Query(default=1, alias="page[number]", ge=1),
+        cursor: str | None = Query(None, description=CURSOR_DESCRIPTION),
+        fields: tuple[str, ...] | None = Depends(sparse_fields(Person)),
         service: PersonService = Depends(get_person_service)
 ) -> list[Person]:
     """
@@ -111,5 +173,7 @@ async def get_query(
     Examples:
     >>> http://127.0.0.1:8000/api/v1/persons/search/?query=marina
     """
-    res = await service.search(query=query, page_size=page_size, page_number=page_number)
-    return res
+    page = await service.search(query=query, page_size=page_size,
+                                page_number=page_number, cursor=cursor,
+                                fields=fields)
+    return page_response(page)
@@ -0,0 +1,14 @@
+"""
+The module contains the 'query' parameter of the search routes.
+"""
+from fastapi import Query
+
+from src.services.search_query import normalize_query
+
+
+def search_query(query: str = Query(...)) -> str:
+    """
+    Return the normalized search query, so equivalent queries share one
+    cache entry.
+    """
+    return normalize_query(query)
@@ -0,0 +1,58 @@
+"""
+The module is responsible for reporting internal counters of the worker.
+"""
+from fastapi import APIRouter, Query
+
+from src.core.cache_key import access_key
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.db.redis import get_redis
+from src.services.telemetry import unique_key
+
+router = APIRouter()
+
+
+@router.get('/cache',
+            response_model=dict[str, float],
+            summary="Get cache counters",
+            response_description="Return cache counters and gauges",
+            )
+async def get_cache_stats() -> dict[str, float]:
+    """
+    Get cache counters and gauges of the worker that handles the request.
+
+    Examples:
+    >>> http://127.0.0.1:8000/api/v1/stats/cache
+    """
+    return metrics.snapshot()
+
+
+@router.get('/hot',
+            summary="Get the most accessed objects",
+            response_description="Return the number of the requested ids "
+                                 "today and the most accessed ids with "
+                                 "their access counts",
+            )
+async def get_hot_keys(
+        namespace: str = Query(settings.ES_INDEX_MOVIES),
+        top: int = Query(settings.HOT_KEYS_TOP, ge=1,
+                         le=settings.ACCESS_MAX_KEYS),
+) -> dict:
+    """
+    Get the most accessed objects of a namespace across all the workers.
+    The counts of the last ACCESS_FLUSH_INTERVAL_IN_SECONDS are not flushed
+    yet.
+
+    Examples:
+    >>> http://127.0.0.1:8000/api/v1/stats/hot?namespace=persons&top=10
+    """
+    redis = await get_redis()
+    pipe = redis.pipeline()
+    unique = pipe.pfcount(unique_key(namespace))
+    hot = pipe.zrevrange(access_key(namespace), 0, top - 1,
+                         withscores=True, encoding='utf-8')
+    await pipe.execute()
+    return {
+        'unique_today': await unique,
+        'top': [{'id': x, 'count': int(count)} for x, count in await hot],
+    }
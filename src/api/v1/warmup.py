@@ -0,0 +1,146 @@
+"""
+The module warms up the response cache of the v1 routes.
+
+The first list pages of every entity, the most accessed detail pages and all
+the genres are stored with the same keys and bodies as the live requests,
+since they go through the same redis_cache of the routes.
+"""
+import asyncio
+import logging
+import math
+from collections import Counter
+from typing import Awaitable, Callable
+
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+from fastapi import HTTPException
+
+from src.api.v1 import films, genres, persons
+from src.core import cache_key
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.services import GenreService, build_services
+from src.services.cache import LocalCache
+from src.services.single_flight import RedisLease
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(redis: Redis,
+                  es: AsyncElasticsearch,
+                  local: LocalCache | None = None,
+                  list_pages: int = settings.WARMUP_LIST_PAGES,
+                  top_details: int = settings.WARMUP_TOP_DETAILS,
+                  concurrency: int = settings.WARMUP_CONCURRENCY,
+                  ) -> Counter:
+    """
+    Store the hot responses that are not cached yet.
+
+    :param redis: Redis connection
+    :param es: Elasticsearch connection
+    :param local: in-process cache of the worker
+    :param list_pages: number of the first list pages of films and persons
+    :param top_details: number of the most accessed films and persons, 0
+        skips them
+    :param concurrency: maximum number of concurrent requests
+    :return: numbers of the stored, skipped and failed responses
+    """
+    services = build_services(redis, es, local)
+    film_service, genre_service = services.film, services.genre
+    person_service = services.person
+    semaphore = asyncio.Semaphore(concurrency)
+    result = Counter()
+
+    async def warm(fill: Callable[..., Awaitable[bool]], **kwargs) -> None:
+        async with semaphore:
+            try:
+                stored = await fill(**kwargs)
+            except HTTPException:
+                stored = None
+            except Exception:
+                logger.exception('Failed to warm up %s with %s',
+                                 fill.__qualname__, kwargs)
+                stored = None
+        outcome = {True: 'stored', False: 'skipped', None: 'failed'}[stored]
+        result[outcome] += 1
+        metrics.incr(f'warmup.{outcome}')
+
+    genre_ids = await _all_ids(genre_service)
+    # The pages that the requests without a page size read
+    page_size = genres.get_genres_list.defaults()['page_size']
+    genre_pages = math.ceil(len(genre_ids) / page_size)
+    film_ids, person_ids = [], []
+    if top_details > 0:
+        film_ids = await redis.zrevrange(
+            cache_key.access_key(settings.ES_INDEX_MOVIES), 0,
+            top_details - 1, encoding='utf-8')
+        person_ids = await redis.zrevrange(
+            cache_key.access_key(settings.ES_INDEX_PERSONS), 0,
+            top_details - 1, encoding='utf-8')
+
+    await asyncio.gather(
+        *(warm(films.get_films_list.warm, page_number=page,
+               service=film_service)
+          for page in range(1, list_pages + 1)),
+        *(warm(persons.get_persons_list.warm, page_number=page,
+               service=person_service)
+          for page in range(1, list_pages + 1)),
+        *(warm(genres.get_genres_list.warm, page_number=page,
+               service=genre_service)
+          for page in range(1, genre_pages + 1)),
+        *(warm(films.get_object_by_id.warm, film_id=x,
+               service=film_service) for x in film_ids),
+        *(warm(persons.get_object_by_id.warm, person_id=x,
+               service=person_service) for x in person_ids),
+        *(warm(genres.get_object_by_id.warm, genre_id=x,
+               service=genre_service) for x in genre_ids),
+    )
+    return result
+
+
+async def keep_warm(redis: Redis,
+                    es: AsyncElasticsearch,
+                    local: LocalCache | None = None) -> None:
+    """
+    Warm up the cache after startup and whenever the ETL has changed the
+    indexes, until cancelled.
+
+    The warm-up of a set of generations runs in one worker only. The lease
+    is not released, so the other workers skip the same warm-up until it
+    expires.
+
+    :param redis: Redis connection
+    :param es: Elasticsearch connection
+    :param local: in-process cache of the worker
+    """
+    warmed = None
+    while True:
+        generations = dict(cache_key.generations)
+        await asyncio.sleep(settings.WARMUP_DEBOUNCE_IN_SECONDS)
+        # Wait for the ETL cycle to finish
+        if generations == warmed or generations != cache_key.generations:
+            continue
+        warmed = generations
+        tag = ','.join(f'{k}={v}' for k, v in sorted(generations.items()))
+        lease = RedisLease(redis, f'warmup:{tag}',
+                           ttl_ms=settings.WARMUP_LEASE_MS)
+        if not await lease.acquire():
+            continue
+        try:
+            result = await warm_up(redis, es, local)
+            logger.info('Warmed up the cache: %s', dict(result))
+        except Exception:
+            logger.exception('Failed to warm up the cache')
+
+
+async def _all_ids(service: GenreService) -> list[str]:
+    """Return the ids of all the objects of the service index."""
+    ids, page_number = [], 1
+    while True:
+        page = await service.get_many('', settings.MAX_PAGE_SIZE,
+                                      page_number, fields=('id',))
+        ids += [x['id'] if isinstance(x, dict) else x.id
+                for x in page.items]
+        if len(page.items) < settings.MAX_PAGE_SIZE:
+            return ids
+        page_number += 1
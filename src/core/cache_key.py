@@ -0,0 +1,102 @@
+"""
+This module builds deterministic cache keys for the API responses.
+
+Keys do not depend on the process that builds them, so all the workers
+share the same entries. The key has the following layout:
+
+    <prefix>:v<schema>:<namespace>:<namespace version>.<generation>:<digest>
+
+Bumping the namespace version in the settings makes all the keys of the
+namespace unreachable, and the old entries die out by their TTL. The
+generation does the same whenever the ETL changes the documents the
+namespace depends on.
+"""
+
+import hashlib
+from typing import Any, Mapping
+
+import orjson
+
+from src.core.config import settings
+
+KEY_PARAM_TYPES = (str, int, float, bool, type(None))
+
+# Change generations of the indexes, kept up to date by the change events
+generations: dict[str, int] = {}
+
+
+def canonical_params(params: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Return the parameters that define the response.
+
+    The parameters are expected to be the keyword arguments resolved by
+    FastAPI, so query aliases (e.g. 'page[size]') are already mapped to the
+    argument names and defaults are filled in. Dependencies (services,
+    requests) are not part of the canonical form.
+
+    :param params: keyword arguments of the endpoint
+    :return: a dict of scalar (or list of scalar) parameters
+    """
+    canonical = {}
+    for name, value in params.items():
+        if isinstance(value, KEY_PARAM_TYPES):
+            canonical[name] = value
+        elif isinstance(value, (list, tuple)) and all(
+                isinstance(x, KEY_PARAM_TYPES) for x in value):
+            canonical[name] = list(value)
+    return canonical
+
+
+def namespace_prefix(namespace: str) -> str:
+    """
+    Return the prefix shared by all the current keys of the namespace.
+
+    :param namespace: cache namespace, as a rule an Elasticsearch index
+    :return: key prefix
+    """
+    version = settings.CACHE_NAMESPACE_VERSIONS.get(namespace, 0)
+    return (f'{settings.CACHE_KEY_PREFIX}:v{settings.CACHE_SCHEMA_VERSION}:'
+            f'{namespace}:{version}.{namespace_generation(namespace)}')
+
+
+def namespace_generation(namespace: str) -> int:
+    """
+    Return the generation of the namespace, which grows with every change
+    of the indexes the namespace depends on.
+
+    :param namespace: cache namespace, as a rule an Elasticsearch index
+    :return: generation
+    """
+    return sum(
+        generation for index, generation in generations.items()
+        if namespace in settings.CACHE_INVALIDATION_DEPENDENCIES.get(
+            index, [index])
+    )
+
+
+def build_key(namespace: str, route: str, params: Mapping[str, Any]) -> str:
+    """
+    Build a cache key that is the same in every process.
+
+    :param namespace: cache namespace, as a rule an Elasticsearch index
+    :param route: a stable name of the endpoint
+    :param params: keyword arguments of the endpoint
+    :return: cache key
+    """
+    payload = orjson.dumps(
+        {'route': route, 'params': canonical_params(params)},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    return f'{namespace_prefix(namespace)}:{digest}'
+
+
+def access_key(namespace: str) -> str:
+    """
+    Return the key of the sorted set of the access counts of the objects
+    of the namespace.
+
+    :param namespace: cache namespace, as a rule an Elasticsearch index
+    :return: key
+    """
+    return f'{settings.CACHE_KEY_PREFIX}:access:{namespace}'
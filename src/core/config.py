@@ -21,6 +21,11 @@ class Settings(BaseSettings):
 
     REDIS_HOST: str = Field('127.0.0.1', env='REDIS_HOST')
     REDIS_PORT: int = Field(6379, env='REDIS_PORT')
+    # Commands of concurrent requests share pipelines, so a few connections
+    # of the pool are enough
+    REDIS_AUTO_PIPELINE: bool = Field(True, env='REDIS_AUTO_PIPELINE')
+    REDIS_POOL_MINSIZE: int = Field(2, env='REDIS_POOL_MINSIZE')
+    REDIS_POOL_MAXSIZE: int = Field(10, env='REDIS_POOL_MAXSIZE')
 
     PROJECT_NAME = Field('movies', env='PROJECT_NAME')
 
@@ -29,11 +34,96 @@ class Settings(BaseSettings):
     ES_INDEX_PERSONS: str = Field('persons')
 
     ES_SIZE: int = Field(1000)
+    # Page number pagination cannot go deeper, use cursors instead
+    ES_MAX_RESULT_WINDOW: int = Field(10_000)
+    # Keep cursor pages consistent across ETL refreshes with a point in time
+    ES_CURSOR_PIT: bool = Field(False, env='ES_CURSOR_PIT')
+    ES_PIT_KEEP_ALIVE: str = Field('1m')
+    MAX_PAGE_SIZE: int = Field(100)
+    MAX_BATCH_SIZE: int = Field(100)
+    # Return Elasticsearch documents as they are instead of building models
+    ES_FAST_PATH: bool = Field(False, env='ES_FAST_PATH')
 
-    CACHE_EXPIRE_IN_SECONDS: int = Field(10 * 5)
-    FILM_CACHE_EXPIRE_IN_SECONDS: int = Field(10 * 5)
-    GENRE_CACHE_EXPIRE_IN_SECONDS: int = Field(10 * 5)
-    PERSON_CACHE_EXPIRE_IN_SECONDS: int = Field(10 * 5)
+    # The ETL change events drop the changed entries, TTLs only bound the
+    # staleness when the events are lost
+    CACHE_EXPIRE_IN_SECONDS: int = Field(60 * 60)
+    FILM_CACHE_EXPIRE_IN_SECONDS: int = Field(60 * 60)
+    GENRE_CACHE_EXPIRE_IN_SECONDS: int = Field(60 * 60)
+    PERSON_CACHE_EXPIRE_IN_SECONDS: int = Field(60 * 60)
+    # Stale entries are served while they are refreshed in the background
+    CACHE_STALE_IN_SECONDS: int = Field(10 * 30)
+    # XFetch beta for refreshing hot entries early, 0 disables it
+    CACHE_EARLY_REFRESH_BETA: float = Field(1.0)
+
+    CACHE_KEY_PREFIX: str = Field('cinema', env='CACHE_KEY_PREFIX')
+    CACHE_SCHEMA_VERSION: int = Field(3, env='CACHE_SCHEMA_VERSION')
+    # Bump a namespace version to drop all its entries, e.g. {"movies": 2}
+    CACHE_NAMESPACE_VERSIONS: dict[str, int] = Field(
+        {}, env='CACHE_NAMESPACE_VERSIONS')
+    # Encoding of the stored responses: json, zlib, lzma or compact (zlib
+    # primed with the field names of the models). Entries carry the codec
+    # in a header byte, so changing it keeps the stored ones readable
+    CACHE_CODEC: str = Field('compact', env='CACHE_CODEC')
+    CACHE_CODECS: dict[str, str] = Field({}, env='CACHE_CODECS')
+    CACHE_ZLIB_LEVEL: int = Field(6)
+    CACHE_LZMA_PRESET: int = Field(1)
+    # List entries keep only the ids of the listed objects and the pages are
+    # assembled from the cached objects, which are stored once and dropped
+    # by the change events of their ids
+    CACHE_NORMALIZED: bool = Field(False, env='CACHE_NORMALIZED')
+    # The ETL publishes the changed ids of an index to this channel
+    CACHE_CHANGES_CHANNEL: str = Field('cinema:changes',
+                                       env='CACHE_CHANGES_CHANNEL')
+    # Cache namespaces whose entries depend on the documents of an index
+    CACHE_INVALIDATION_DEPENDENCIES: dict[str, list[str]] = Field({
+        'movies': ['movies'],
+        'persons': ['persons', 'movies'],
+        'genres': ['genres', 'movies'],
+    })
+    CACHE_GENERATIONS_SYNC_IN_SECONDS: int = Field(30)
+    # A worker refilling a missing key holds a lease, others wait for it
+    CACHE_LEASE_MS: int = Field(3000)
+    CACHE_LEASE_WAIT_MS: int = Field(500)
+    CACHE_LEASE_POLL_MS: int = Field(25)
+    # Search responses are stored once the query has been requested this
+    # many times recently, so long-tail queries do not evict hot entries
+    SEARCH_CACHE_ADMIT_AFTER: int = Field(2)
+    CACHE_ADMISSION_SKETCH_WIDTH: int = Field(1 << 16)
+    CACHE_ADMISSION_WINDOW_IN_SECONDS: int = Field(10 * 60)
+
+    LOCAL_CACHE_ENABLED: bool = Field(False, env='LOCAL_CACHE_ENABLED')
+    LOCAL_CACHE_MAX_ITEMS: int = Field(10_000)
+    LOCAL_CACHE_MAX_BYTES: int = Field(64 * 1024 * 1024)
+    LOCAL_CACHE_EXPIRE_IN_SECONDS: int = Field(10)
+
+    # Misses of the lookups by id are cached for a short time
+    NEGATIVE_CACHE_EXPIRE_IN_SECONDS: int = Field(10)
+    # Reject unknown ids by Bloom filters of the indexes. The filters take
+    # the ids of the ETL change events and are rebuilt after them
+    BLOOM_FILTER_ENABLED: bool = Field(False, env='BLOOM_FILTER_ENABLED')
+    BLOOM_FALSE_POSITIVE_RATE: float = Field(0.01)
+    BLOOM_REBUILD_INTERVAL_IN_SECONDS: int = Field(60)
+    BLOOM_CHECK_INTERVAL_IN_SECONDS: int = Field(5)
+    # Quiet time after the last ETL change event before a rebuild
+    BLOOM_CHANGE_DELAY_IN_SECONDS: int = Field(10)
+
+    # Fill the first list pages, the most accessed details and all the
+    # genres after startup and after the ETL changes the indexes
+    WARMUP_ENABLED: bool = Field(False, env='WARMUP_ENABLED')
+    WARMUP_LIST_PAGES: int = Field(3)
+    WARMUP_TOP_DETAILS: int = Field(100)
+    # Concurrent requests of the warm-up, keep it low to leave room for the
+    # live traffic
+    WARMUP_CONCURRENCY: int = Field(4)
+    # The warm-up starts once the generations stop changing for this long
+    WARMUP_DEBOUNCE_IN_SECONDS: int = Field(10)
+    WARMUP_LEASE_MS: int = Field(10 * 60 * 1000)
+    # Access counts are kept in memory and added to Redis this often
+    ACCESS_FLUSH_INTERVAL_IN_SECONDS: int = Field(10)
+    # Only the most accessed ids of a namespace keep their counts
+    ACCESS_MAX_KEYS: int = Field(10_000)
+    # The most accessed ids are pinned in the local cache
+    HOT_KEYS_TOP: int = Field(100)
 
     CINEMA_MODEL = typing.TypeVar('CINEMA_MODEL',
                                   models.Film,
@@ -0,0 +1,31 @@
+"""
+This module contains in-process counters and gauges of the worker.
+"""
+
+from collections import Counter
+
+
+class Metrics:
+    """A registry of named counters and gauges."""
+
+    def __init__(self) -> None:
+        self._counters: Counter[str] = Counter()
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """Increase the counter by the value."""
+        self._counters[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        """Set the gauge to the value."""
+        self._counters[name] = value
+
+    def get(self, name: str) -> float:
+        """Return the value of the counter."""
+        return self._counters[name]
+
+    def snapshot(self) -> dict[str, float]:
+        """Return the copy of all the counters and gauges."""
+        return dict(sorted(self._counters.items()))
+
+
+metrics = Metrics()
@@ -1,7 +1,28 @@
+import orjson
 from elasticsearch import AsyncElasticsearch
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
 
 es: AsyncElasticsearch | None = None
 
 
+class OrjsonSerializer(JSONSerializer):
+    """Transport serializer that encodes and decodes JSON with orjson."""
+
+    def loads(self, s):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data):
+        if isinstance(data, str):
+            return data
+        try:
+            return orjson.dumps(data, default=self.default).decode()
+        except TypeError as e:
+            raise SerializationError(data, e)
+
+
 async def get_elastic() -> AsyncElasticsearch:
     return es
@@ -0,0 +1,50 @@
+"""
+This module contains helpers for sparse fieldsets: responses that carry only
+the fields requested by the client.
+"""
+
+import functools
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field, create_model
+
+from src.models.base import BaseOrjsonModel
+from src.models.serialization import by_alias
+
+
+@functools.lru_cache()
+def response_fields(model: type[BaseModel]) -> tuple[str, ...]:
+    """Return the response field names (aliases) of the model in order."""
+    return tuple(field.alias for field in model.__fields__.values())
+
+
+@functools.lru_cache()
+def partial_model(model: type[BaseModel],
+                  fields: tuple[str, ...]) -> type[BaseOrjsonModel]:
+    """
+    Return a model with only the given fields of the model, all optional.
+
+    :param model: full model
+    :param fields: response field names (aliases) to keep
+    :return: partial model
+    """
+    definitions = {
+        name: (Optional[field.outer_type_], Field(None, alias=field.alias))
+        for name, field in model.__fields__.items()
+        if field.alias in fields
+    }
+    return create_model(f'{model.__name__}Partial',
+                        __base__=BaseOrjsonModel, **definitions)
+
+
+def project(item: BaseModel | dict, fields: tuple[str, ...]) -> dict:
+    """
+    Return only the given fields of the item.
+
+    :param item: model or document
+    :param fields: response field names (aliases) to keep
+    :return: dict of the fields by alias
+    """
+    data: dict[str, Any] = (by_alias(item)
+                            if isinstance(item, BaseModel) else item)
+    return {name: data.get(name) for name in fields}
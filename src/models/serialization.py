@@ -0,0 +1,53 @@
+"""
+This module serializes the models by alias, the way the API returns them.
+
+orjson calls the default function for every model it meets, nested ones
+included, so a model turns into its field values without the recursive
+copy of `BaseModel.dict`. The field names are renamed to the aliases by a
+map computed once per model; models without aliases are written as they
+are.
+"""
+
+import functools
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+
+
+@functools.lru_cache()
+def alias_map(model: type[BaseModel]) -> dict[str, str]:
+    """Return the aliases of the fields of the model that have one."""
+    return {name: field.alias for name, field in model.__fields__.items()
+            if field.alias != name}
+
+
+def by_alias(item: BaseModel) -> dict[str, Any]:
+    """
+    Return the field values of the model by alias. Nested models are kept
+    as they are.
+
+    :param item: model
+    :return: dict of the fields by alias
+    """
+    aliases = alias_map(type(item))
+    if not aliases:
+        return item.__dict__
+    return {aliases.get(name, name): value
+            for name, value in item.__dict__.items()}
+
+
+def _default(obj: Any) -> dict[str, Any]:
+    if isinstance(obj, BaseModel):
+        return by_alias(obj)
+    raise TypeError
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Serialize models, dicts or lists of them to JSON by alias.
+
+    :param data: data to serialize
+    :return: JSON
+    """
+    return orjson.dumps(data, default=_default)
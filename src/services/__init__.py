@@ -2,6 +2,8 @@ __all__ = [
     'FilmService',
     'GenreService',
     'PersonService',
+    'Services',
+    'build_services',
     'get_film_service',
     'get_genre_service',
     'get_person_service',
@@ -10,3 +12,4 @@ __all__ = [
 from src.services.film import FilmService, get_film_service
 from src.services.genre import GenreService, get_genre_service
 from src.services.person import PersonService, get_person_service
+from src.services.container import Services, build_services
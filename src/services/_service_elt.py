@@ -3,14 +3,35 @@ This module contains the base asynchronous ELTService and its abstract class.
 """
 
 import abc
+import functools
 from typing import Any
 
 import elasticsearch
 from aioredis import Redis
 
 from src.core.config import settings
+from src.core.metrics import metrics
+from src.models import serialization
+from src.models.fields import partial_model, response_fields
+from src.services.bloom import bloom_filters
 from src.services.cache import CacheAbstract, RedisCache
+from src.services.pagination import (Page, PaginationError, decode_cursor,
+                                     encode_cursor)
+from src.services.single_flight import coalescer
 from src.services.storage import ElasticStorage, StorageAbstract
+from src.services.telemetry import access_counter
+
+
+# Cached mark of an object that does not exist
+MISSING = object()
+
+
+@functools.lru_cache()
+def response_template(model: settings.CINEMA_MODEL,
+                      fields: tuple[str, ...] | None = None
+                      ) -> dict[str, None]:
+    """Return the response fields of the model (by alias) set to None."""
+    return dict.fromkeys(fields or response_fields(model))
 
 
 class ELTServiceAbstract(abc.ABC):
@@ -51,11 +72,17 @@ class ELTServiceAbstract(abc.ABC):
                         object_id: str,
                         url: str) -> settings.CINEMA_MODEL | None: ...
 
+    @abc.abstractmethod
+    async def get_many_by_ids(
+            self, object_ids: list[str],
+            track: bool = True) -> list[settings.CINEMA_MODEL]: ...
+
     @abc.abstractmethod
     async def get_many(self, url: str,
                        page_size: int,
-                       page_number: int) -> list[settings.CINEMA_MODEL] | list:
-        ...
+                       page_number: int,
+                       cursor: str | None = None,
+                       fields: tuple[str, ...] | None = None) -> Page: ...
 
     @abc.abstractmethod
     async def search(
@@ -63,7 +90,9 @@ class ELTServiceAbstract(abc.ABC):
             query: str,
             page_size: int,
             page_number: int,
-    ) -> list[settings.CINEMA_MODEL] | list: ...
+            cursor: str | None = None,
+            fields: tuple[str, ...] | None = None,
+    ) -> Page: ...
 
     ##############################################
     # Protected Methods
@@ -75,7 +104,7 @@ class ELTServiceAbstract(abc.ABC):
 
     @abc.abstractmethod
     async def _get_from_cache(
-            self, object_id: str) -> settings.CINEMA_MODEL | None: ...
+            self, object_id: str) -> settings.CINEMA_MODEL | object | None: ...
 
     @abc.abstractmethod
     async def _put_to_cache(self, item: settings.CINEMA_MODEL) -> None: ...
@@ -104,6 +133,7 @@ class ELTService(ELTServiceAbstract):
         self._model = None
         self._index = None
         self._cache_expire = settings.CACHE_EXPIRE_IN_SECONDS
+        self._sort = []
 
     @property
     def cache(self) -> Redis:
@@ -135,51 +165,129 @@ class ELTService(ELTServiceAbstract):
         :param url: URL to specify the Elasticsearch index.
         :return: cinema model or None
         """
+        bloom = bloom_filters.get(self._index)
+        if bloom is not None and object_id not in bloom:
+            metrics.incr(f'cache.{self._index}.bloom_reject')
+            return None
+
         obj = await self._get_from_cache(object_id)
-        if not obj:
-            obj = await self._get_from_storage(object_id)
-            if not obj:
-                return None
-            await self._put_to_cache(obj)
-        return obj
+        if obj is MISSING:
+            metrics.incr(f'cache.{self._index}.negative_hit')
+            return None
+        if obj is not None:
+            metrics.incr(f'cache.{self._index}.hit')
+            return obj
+
+        async def fill() -> settings.CINEMA_MODEL | object:
+            item = await self._get_from_storage(object_id)
+            if item is None:
+                await self._put_missing_to_cache(object_id)
+                return MISSING
+            await self._put_to_cache(item)
+            return item
+
+        obj = await coalescer.run(
+            self.cache, object_id, fill,
+            functools.partial(self._get_from_cache, object_id), self._index,
+        )
+        return None if obj is MISSING else obj
+
+    async def get_many_by_ids(
+            self, object_ids: list[str],
+            track: bool = True) -> list[settings.CINEMA_MODEL]:
+        """
+        Get the objects by ids with one round trip to Redis and at most one
+        to Elasticsearch.
+
+        The ids found in neither are skipped, the order of the others is
+        kept and duplicates are returned once.
+
+        :param object_ids: ids
+        :param track: whether to count the requests of the objects
+        :return: list of cinema models
+        """
+        object_ids = list(dict.fromkeys(object_ids))
+        bloom = bloom_filters.get(self._index)
+        if bloom is not None:
+            object_ids = [x for x in object_ids if x in bloom]
+        found: dict[str, settings.CINEMA_MODEL] = {}
+        local = self._redis.local
+        if local is not None:
+            for object_id in object_ids:
+                obj = local.get(object_id)
+                if obj is not None:
+                    found[object_id] = obj
+
+        missing = [x for x in object_ids if x not in found]
+        for object_id, data in zip(missing,
+                                   await self._redis.mget(missing)):
+            if data:
+                found[object_id] = self._from_cache_row(object_id, data)
+        metrics.incr(f'cache.{self._index}.hit', len(found))
+
+        missing = [x for x in object_ids if x not in found]
+        if missing:
+            metrics.incr(f'cache.{self._index}.miss', len(missing))
+            items = await self._mget_from_storage(missing)
+            await self._put_many_to_cache(items)
+            found.update((item.id, item) for item in items)
+        if track:
+            for object_id in found:
+                access_counter.record(self._index, object_id)
+        return [found[x] for x in object_ids if x in found]
+
+    async def cache_many(self, items: list[dict[str, Any]]) -> None:
+        """
+        Cache the objects of a response so that lookups by id hit them.
+
+        :param items: full objects by response field names (aliases)
+        :return: None
+        """
+        await self._put_many_to_cache(
+            [self._model.parse_obj(x) for x in items])
 
     async def get_many(self, url: str,
                        page_size: int,
-                       page_number: int) -> list[settings.CINEMA_MODEL] | list:
+                       page_number: int,
+                       cursor: str | None = None,
+                       fields: tuple[str, ...] | None = None) -> Page:
         """
-        GET a list of objects from Elasticsearch given page size and number.
+        GET a page of objects from Elasticsearch given page size and number,
+        or given the cursor of the page.
 
         :param url: URL to specify the target Elasticsearch index
         :param page_size:
         :param page_number:
-        :return: a list of requested cinema objects (or empty list in case
+        :param cursor: cursor of the page, an empty one for the first page
+        :param fields: response fields to return, all by default
+        :return: a page of requested cinema objects (or empty page in case
             the response is empty)
         """
-        doc = await self._elastic.search(
-            index=self._index, from_=(page_number - 1) * page_size,
-            size=page_size,
+        return await self._search_page(
+            self._index, {}, page_size, page_number, cursor, self._sort,
+            fields=fields,
         )
-        res = [self._model(**x['_source']) for x in doc['hits']['hits']]
-        return res
 
     async def search(
             self,
             query: str,
             page_size: int,
             page_number: int,
-    ) -> list[settings.CINEMA_MODEL] | list:
+            cursor: str | None = None,
+            fields: tuple[str, ...] | None = None,
+    ) -> Page:
         """
         GET objects from Elasticsearch according to the user's request.
 
         :param query: search query
         :param page_number: page number
         :param page_size: page size
-        :return: a list of requested cinema objects (or empty list in case
+        :param cursor: cursor of the page, an empty one for the first page
+        :param fields: response fields to return, all by default
+        :return: a page of requested cinema objects (or empty page in case
             the response is empty)
         """
         body = {
-            'size': page_size,
-            'from': (page_number - 1) * page_size,
             'query': {
                 'simple_query_string': {
                     'query': query,
@@ -187,9 +295,120 @@ class ELTService(ELTServiceAbstract):
                 }
             }
         }
-        doc = await self._elastic.search(index=self._index, body=body)
-        res = [self._model(**x['_source']) for x in doc['hits']['hits']]
-        return res
+        return await self._search_page(
+            self._index, body, page_size, page_number, cursor, ['_score'],
+            fields=fields, request_cache=True,
+        )
+
+    async def _search_page(self,
+                           index: str,
+                           body: dict[str, Any],
+                           page_size: int,
+                           page_number: int,
+                           cursor: str | None,
+                           sort: list,
+                           model: settings.CINEMA_MODEL | None = None,
+                           fields: tuple[str, ...] | None = None,
+                           request_cache: bool = False,
+                           ) -> Page:
+        """
+        Run the search for a page given either by number or by cursor.
+
+        Cursor pages use search_after over the stable sort, optionally
+        within a point in time, so deep pages cost the same as the first one.
+
+        :param index: Elasticsearch index
+        :param body: search request body without paging
+        :param page_size: page size
+        :param page_number: page number, used when there is no cursor
+        :param cursor: cursor of the page
+        :param sort: sort of the cursor pages without the tiebreaker
+        :param model: model of the documents, the service model by default
+        :param fields: response fields to return, all by default
+        :param request_cache: whether to use the shard request cache of
+            Elasticsearch, which by default caches only size=0 requests
+        :return: page of documents
+        """
+        body = {**body, 'size': page_size}
+        params = self._search_params(model, fields)
+        if request_cache:
+            params['request_cache'] = 'true'
+
+        if cursor is None:
+            offset = (page_number - 1) * page_size
+            if offset + page_size > settings.ES_MAX_RESULT_WINDOW:
+                raise PaginationError(
+                    'The page is too deep, use the cursor instead')
+            body['from'] = offset
+            doc = await self._elastic.search(index=index, body=body,
+                                             **params)
+            return Page(self._documents(doc, model, fields))
+
+        position = decode_cursor(cursor)
+        if settings.ES_CURSOR_PIT:
+            # Within a point in time ES breaks ties by the shard document
+            pit = position['pit'] or await self._elastic.open_point_in_time(
+                index, keep_alive=settings.ES_PIT_KEEP_ALIVE)
+            body['pit'] = {'id': pit, 'keep_alive': settings.ES_PIT_KEEP_ALIVE}
+            body['sort'] = sort
+            index = None
+        else:
+            body['sort'] = [*sort, {'id': 'asc'}]
+        if position['after'] is not None:
+            body['search_after'] = position['after']
+        params['filter_path'] = [*params['filter_path'],
+                                 'hits.hits.sort', 'pit_id']
+
+        doc = await self._elastic.search(index=index, body=body, **params)
+        hits = doc.get('hits', {}).get('hits', [])
+        next_cursor = None
+        if len(hits) == page_size:
+            next_cursor = encode_cursor(hits[-1]['sort'], doc.get('pit_id'))
+        return Page(self._documents(doc, model, fields), next_cursor,
+                    cacheable=not settings.ES_CURSOR_PIT)
+
+    def _search_params(self,
+                       model: settings.CINEMA_MODEL | None = None,
+                       fields: tuple[str, ...] | None = None,
+                       ) -> dict[str, Any]:
+        """
+        Return the parameters that cut the search response down to the
+        documents.
+
+        :param model: model of the documents, the service model by default
+        :param fields: response fields to return, all by default
+        :return: keyword arguments for the search request
+        """
+        params = {'filter_path': ['hits.hits._source']}
+        if settings.ES_FAST_PATH or fields:
+            params['_source_includes'] = list(
+                response_template(model or self._model, fields))
+        return params
+
+    def _documents(self, doc: dict,
+                   model: settings.CINEMA_MODEL | None = None,
+                   fields: tuple[str, ...] | None = None) -> list:
+        """
+        Turn the search hits into the response items.
+
+        With ES_FAST_PATH enabled the '_source' objects are returned as they
+        are, padded with the missing optional fields, instead of building
+        models. The response schema is then enforced by the tests.
+
+        :param doc: search response
+        :param model: model of the documents, the service model by default
+        :param fields: response fields to return, all by default
+        :return: list of models or dicts
+        """
+        model = model or self._model
+        # filter_path drops the 'hits' key when nothing is found
+        hits = doc.get('hits', {}).get('hits', [])
+        if settings.ES_FAST_PATH:
+            template = response_template(model, fields)
+            return [{**template, **x['_source']} for x in hits]
+        if fields:
+            model = partial_model(model, fields)
+        return [model(**x['_source']) for x in hits]
 
     async def _get_from_storage(
             self, object_id: str) -> settings.CINEMA_MODEL | None:
@@ -205,18 +424,49 @@ class ELTService(ELTServiceAbstract):
             return
         return self._model(**doc['_source'])
 
-    async def _get_from_cache(self,
-                              object_id: str) -> settings.CINEMA_MODEL | None:
+    async def _mget_from_storage(
+            self, object_ids: list[str]) -> list[settings.CINEMA_MODEL]:
+        """
+        Handle the request to Elasticsearch based on objects' ids.
+
+        :param object_ids: ids
+        :return: list of the found cinema models
+        """
+        doc = await self._elastic.mget(
+            body={'ids': object_ids}, index=self._index,
+            filter_path=['docs._source'],
+        )
+        # Missing documents come without '_source'
+        return [self._model(**x['_source'])
+                for x in doc.get('docs', []) if '_source' in x]
+
+    async def _get_from_cache(
+            self, object_id: str) -> settings.CINEMA_MODEL | object | None:
         """
         Handle the request to Redis cache based on object's id.
 
         :param object_id: id персоны
-        :return: cinema model or None
+        :return: cinema model, MISSING if the object is known to be missing
+            or None
         """
-        data = await self._redis.get(object_id)
-        if not data:
-            return None
+        local = self._redis.local
+        if local is not None:
+            obj = local.get(object_id)
+            if obj is not None:
+                return obj
+
+        data, missing = await self._redis.mget(
+            [object_id, self._missing_key(object_id)])
+        if data:
+            return self._from_cache_row(object_id, data)
+        return MISSING if missing is not None else None
+
+    def _from_cache_row(self, object_id: str,
+                        data: bytes) -> settings.CINEMA_MODEL:
+        """Build the model from the cached JSON and keep it in-process."""
         obj = self._model.parse_raw(data)
+        if self._redis.local is not None:
+            self._redis.local.set(object_id, obj, size=len(data))
         return obj
 
     async def _put_to_cache(self, item: settings.CINEMA_MODEL) -> None:
@@ -226,9 +476,42 @@ class ELTService(ELTServiceAbstract):
         :param item: person
         :return: None
         """
-        row = item.json()
-        if self._index == 'persons':
-            row = row.replace('full_name', 'name')
+        row = self._to_cache_row(item)
         await self._redis.set(
             item.id, row, expire=self._cache_expire,
         )
+
+    async def _put_missing_to_cache(self, object_id: str) -> None:
+        """
+        Remember for a short time that there is no object with the id.
+
+        :param object_id: id
+        :return: None
+        """
+        await self._redis.set(self._missing_key(object_id), b'1',
+                              expire=settings.NEGATIVE_CACHE_EXPIRE_IN_SECONDS)
+
+    def _missing_key(self, object_id: str) -> str:
+        """Return the key of the negative cache entry of the id."""
+        return f'{settings.CACHE_KEY_PREFIX}:missing:{self._index}:{object_id}'
+
+    async def _put_many_to_cache(
+            self, items: list[settings.CINEMA_MODEL]) -> None:
+        """
+        Put the objects to Redis cache in one round trip.
+
+        :param items: cinema models
+        :return: None
+        """
+        await self._redis.mset(
+            {item.id: self._to_cache_row(item) for item in items},
+            expire=self._cache_expire,
+        )
+
+    def _to_cache_row(self, item: settings.CINEMA_MODEL) -> bytes:
+        """Serialize the object for the cache and keep it in-process."""
+        row = serialization.dumps(item)
+        if self._redis.local is not None:
+            self._redis.local.set(item.id, item, size=len(row),
+                                  ttl=self._cache_expire)
+        return row
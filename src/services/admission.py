@@ -0,0 +1,83 @@
+"""
+This module contains the frequency based admission policy of the cache.
+
+A one-off request should not push a popular entry out of Redis, so an entry
+is stored only once its key has been requested often enough recently
+(TinyLFU). The frequencies are estimated by a count-min sketch of 4-bit
+counters kept in Redis, so all the workers share it. The sketch lives in
+time windows and the estimate adds half of the previous window, so old
+popularity fades away as with the halving of TinyLFU.
+"""
+
+import hashlib
+import time
+
+from aioredis import Redis
+
+from src.core.config import settings
+
+# KEYS: current and previous window, ARGV: TTL, counter offsets
+TOUCH_SCRIPT = """
+local incr, get = {'OVERFLOW', 'SAT'}, {}
+for i = 2, #ARGV do
+    for _, arg in ipairs({'INCRBY', 'u4', ARGV[i], 1}) do
+        table.insert(incr, arg)
+    end
+    for _, arg in ipairs({'GET', 'u4', ARGV[i]}) do
+        table.insert(get, arg)
+    end
+end
+local current = redis.call('BITFIELD', KEYS[1], unpack(incr))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+local previous = redis.call('BITFIELD', KEYS[2], unpack(get))
+local estimate = current[1] + math.floor(previous[1] / 2)
+for i = 2, #current do
+    estimate = math.min(estimate, current[i] + math.floor(previous[i] / 2))
+end
+return estimate
+"""
+
+
+class FrequencySketch:
+    """Count-min sketch of the recent key frequencies in Redis."""
+
+    DEPTH = 4
+
+    def __init__(self, name: str, width: int, window: int) -> None:
+        """
+        Initialize the class.
+
+        :param name: name of the sketch, a part of its Redis keys
+        :param width: number of counters in a row, about the number of keys
+            that are tracked
+        :param window: length of a window in seconds
+        """
+        self._name = name
+        self._width = width
+        self._window = window
+
+    async def touch(self, redis: Redis, key: str) -> int:
+        """
+        Count one more request of the key.
+
+        :param redis: Redis connection
+        :param key: cache key
+        :return: estimated number of the recent requests of the key
+        """
+        window = int(time.time()) // self._window
+        prefix = f'{settings.CACHE_KEY_PREFIX}:sketch:{self._name}'
+        return await redis.eval(
+            TOUCH_SCRIPT,
+            keys=[f'{prefix}:{window}', f'{prefix}:{window - 1}'],
+            args=[2 * self._window, *self._offsets(key)],
+        )
+
+    def _offsets(self, key: str) -> list[str]:
+        # The offsets must be the same in every worker, so no hash()
+        digest = hashlib.blake2b(key.encode(),
+                                 digest_size=4 * self.DEPTH).digest()
+        offsets = []
+        for row in range(self.DEPTH):
+            column = int.from_bytes(digest[4 * row:4 * row + 4], 'big')
+            offsets.append(f'#{row * self._width + column % self._width}')
+        return offsets
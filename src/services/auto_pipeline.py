@@ -0,0 +1,80 @@
+"""
+This module batches the Redis commands of concurrent requests.
+
+The commands that the coroutines issue within one event-loop tick are sent
+to Redis in one pipeline, so a burst of cache lookups costs one write and
+one connection of the pool instead of one each.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from aioredis import Redis
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Commands without side effects on the connection state. Transactions,
+# blocking and pub/sub commands go to the pool as they are
+PIPELINED = frozenset({'get', 'set', 'mget', 'exists', 'delete', 'expire',
+                       'eval', 'zincrby', 'hgetall', 'publish'})
+
+
+class AutoPipeline:
+    """
+    A Redis client that pipelines the commands issued in the same tick.
+
+    Any other attribute is the one of the wrapped client.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._queue: list[tuple[str, tuple, dict, asyncio.Future]] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._redis, name)
+        if name not in PIPELINED:
+            return attr
+
+        def command(*args, **kwargs) -> asyncio.Future:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            if not self._queue:
+                loop.call_soon(self._flush)
+            self._queue.append((name, args, kwargs, future))
+            return future
+
+        return command
+
+    def _flush(self) -> None:
+        queue, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._execute(queue))
+        # The loop keeps weak references to the tasks only
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(
+            self,
+            queue: list[tuple[str, tuple, dict, asyncio.Future]]) -> None:
+        pipe = self._redis.pipeline()
+        for name, args, kwargs, _ in queue:
+            getattr(pipe, name)(*args, **kwargs)
+        metrics.incr('redis.pipelines')
+        metrics.incr('redis.pipelined_commands', len(queue))
+        try:
+            results = await pipe.execute(return_exceptions=True)
+        except Exception as exc:
+            logger.warning('Redis pipeline of %s commands failed: %s',
+                           len(queue), exc)
+            results = [exc] * len(queue)
+        for (*_, future), result in zip(queue, results):
+            # The caller may have been cancelled meanwhile
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
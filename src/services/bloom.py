@@ -0,0 +1,228 @@
+"""
+This module contains the Bloom filters of the ids that exist in the indexes.
+
+A lookup of an id that is not in the filter of its index is rejected without
+any network I/O. One worker at a time rebuilds a filter from Elasticsearch
+under a lease and stores it in Redis, every worker loads it from there.
+The ids of the ETL change events are added to the filter of the worker
+right away and again to every filter loaded later that was built before
+them. The events also make the filter rebuild once the ETL goes quiet.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import struct
+import time
+
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.services.single_flight import RedisLease
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>QIQ')
+
+
+class BloomFilter:
+    """A Bloom filter of strings."""
+
+    def __init__(self, bits: int, hashes: int, count: int = 0,
+                 data: bytes | None = None) -> None:
+        """
+        Initialize the class.
+
+        :param bits: number of bits
+        :param hashes: number of hash functions
+        :param count: number of the added items
+        :param data: bits of the filter, empty by default
+        """
+        self._bits = bits
+        self._hashes = hashes
+        self._count = count
+        self._data = bytearray(data or (bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fpr: float) -> 'BloomFilter':
+        """Return an empty filter that holds `capacity` items at the false
+        positive rate `fpr`."""
+        capacity = max(capacity, 1)
+        bits = math.ceil(-capacity * math.log(fpr) / math.log(2) ** 2)
+        return cls(bits, max(1, round(bits / capacity * math.log(2))))
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> 'BloomFilter':
+        """Load the filter dumped by to_bytes."""
+        bits, hashes, count = HEADER.unpack_from(raw)
+        return cls(bits, hashes, count, raw[HEADER.size:])
+
+    def to_bytes(self) -> bytes:
+        """Dump the filter."""
+        return HEADER.pack(self._bits, self._hashes, self._count) + \
+            bytes(self._data)
+
+    @property
+    def size(self) -> int:
+        """Return the size of the filter in bytes."""
+        return len(self._data)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def false_positive_rate(self) -> float:
+        """Return the expected false positive rate at the current load."""
+        return (1 - math.exp(-self._hashes * self._count / self._bits)) \
+            ** self._hashes
+
+    def add(self, item: str) -> None:
+        """Add the item."""
+        for position in self._positions(item):
+            self._data[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._data[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        for i in range(self._hashes):
+            yield (first + i * second) % self._bits
+
+
+bloom_filters: dict[str, BloomFilter] = {}
+_loaded: dict[str, bytes] = {}
+# Ids of the change events and the time they came, per index
+_added: dict[str, dict[str, float]] = {}
+_changed_at: dict[str, float] = {}
+
+
+def _redis_key(index: str) -> str:
+    return f'{settings.CACHE_KEY_PREFIX}:bloom:{index}'
+
+
+def add_ids(index: str, ids: list[str]) -> None:
+    """
+    Add the ids of a change event to the filter of the index and keep them
+    to merge into the filters loaded later.
+
+    :param index: Elasticsearch index
+    :param ids: ids indexed by the ETL
+    """
+    now = time.time()
+    added = _added.setdefault(index, {})
+    for object_id in ids:
+        added[object_id] = now
+    _changed_at[index] = now
+    bloom = bloom_filters.get(index)
+    if bloom is not None:
+        for object_id in ids:
+            bloom.add(object_id)
+
+
+def _rebuild_due(index: str, built_at: bytes | None) -> bool:
+    """Check whether the filter is too old or has missed change events."""
+    if built_at is None:
+        return True
+    now, built_at = time.time(), float(built_at)
+    if now - built_at >= settings.BLOOM_REBUILD_INTERVAL_IN_SECONDS:
+        return True
+    # Rebuild once the ETL cycle is over, not after every chunk
+    changed_at = _changed_at.get(index, 0.0)
+    return changed_at > built_at and \
+        now - changed_at >= settings.BLOOM_CHANGE_DELAY_IN_SECONDS
+
+
+async def build_filter(es: AsyncElasticsearch, index: str) -> BloomFilter:
+    """
+    Build the filter of all the ids of the index.
+
+    :param es: Elasticsearch connection
+    :param index: Elasticsearch index
+    :return: Bloom filter
+    """
+    count = (await es.count(index=index))['count']
+    # Leave room for the ids indexed until the next rebuild
+    bloom = BloomFilter.for_capacity(int(count * 1.2) + 1000,
+                                     settings.BLOOM_FALSE_POSITIVE_RATE)
+    async for hit in async_scan(es, index=index, size=5000,
+                                query={'_source': False}):
+        bloom.add(hit['_id'])
+    return bloom
+
+
+async def refresh_filter(redis: Redis, es: AsyncElasticsearch,
+                         index: str) -> None:
+    """
+    Rebuild the filter of the index if it is due and nobody else does it,
+    then load the latest filter into the worker.
+
+    :param redis: Redis connection
+    :param es: Elasticsearch connection
+    :param index: Elasticsearch index
+    """
+    key = _redis_key(index)
+    built_at = await redis.get(f'{key}:built_at')
+    if _rebuild_due(index, built_at):
+        lease = RedisLease(redis, key,
+                           ttl_ms=settings.BLOOM_REBUILD_INTERVAL_IN_SECONDS
+                           * 1000)
+        if await lease.acquire():
+            try:
+                # The ids indexed during the scan may be missed by it
+                started = time.time()
+                bloom = await build_filter(es, index)
+                built_at = str(started).encode()
+                pipe = redis.multi_exec()
+                pipe.set(key, bloom.to_bytes())
+                pipe.set(f'{key}:built_at', built_at)
+                await pipe.execute()
+                metrics.incr(f'bloom.{index}.rebuild')
+            finally:
+                await lease.release()
+
+    if built_at is None or _loaded.get(index) == built_at:
+        return
+    raw = await redis.get(key)
+    if raw is None:
+        return
+    bloom = BloomFilter.from_bytes(raw)
+    # Keep the ids of the events the filter may have been built without,
+    # with a margin for the clocks of the workers
+    since = float(built_at) - settings.BLOOM_CHECK_INTERVAL_IN_SECONDS
+    added = {k: v for k, v in _added.get(index, {}).items() if v >= since}
+    for object_id in added:
+        bloom.add(object_id)
+    _added[index] = added
+    bloom_filters[index] = bloom
+    _loaded[index] = built_at
+    metrics.set(f'bloom.{index}.bytes', bloom.size)
+    metrics.set(f'bloom.{index}.items', len(bloom))
+    metrics.set(f'bloom.{index}.false_positive_rate',
+                bloom.false_positive_rate())
+
+
+async def maintain_filters(redis: Redis, es: AsyncElasticsearch,
+                           indexes: list[str]) -> None:
+    """
+    Keep the filters of the indexes up to date until cancelled.
+
+    :param redis: Redis connection
+    :param es: Elasticsearch connection
+    :param indexes: Elasticsearch indexes
+    """
+    while True:
+        for index in indexes:
+            try:
+                await refresh_filter(redis, es, index)
+            except Exception:
+                logger.exception('Failed to refresh the Bloom filter of %s',
+                                 index)
+        await asyncio.sleep(settings.BLOOM_CHECK_INTERVAL_IN_SECONDS)
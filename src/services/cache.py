@@ -3,11 +3,39 @@ This module contains the classes implement Cache.
 """
 
 import abc
-from typing import Any
+import functools
+import inspect
+import logging
+import lzma
+import math
+import random
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Iterable, NamedTuple
 
+import orjson
 from aioredis import Redis
+from fastapi import Request, params
+from fastapi.responses import Response
+from pydantic.fields import FieldInfo
 
+from src import models
+from src.core.cache_key import build_key
+from src.core.config import settings
+from src.core.metrics import metrics
 from src.db.redis import get_redis
+from src.models import serialization
+from src.models.fields import project, response_fields
+from src.services.admission import FrequencySketch
+from src.services.pagination import NEXT_CURSOR_HEADER, Page
+from src.services.single_flight import coalescer
+from src.services.telemetry import access_counter
+
+logger = logging.getLogger(__name__)
+
+JSON_MEDIA_TYPE = 'application/json'
+NO_STORE = 'no-store'
 
 
 class CacheAbstract(abc.ABC):
@@ -29,11 +57,104 @@ class CacheAbstract(abc.ABC):
         ...
 
 
+class LocalCache:
+    """
+    In-process LRU cache with TTL and a byte budget.
+
+    The cache holds objects that are ready to be returned (models or
+    response bytes), so a hit costs neither a network round trip nor
+    parsing. The size of an entry is the size of its serialized form and is
+    passed by the caller.
+    """
+
+    def __init__(self,
+                 max_items: int,
+                 max_bytes: int,
+                 ttl: int) -> None:
+        """
+        Initialize the class.
+
+        :param max_items: maximum number of entries
+        :param max_bytes: maximum total size of entries
+        :param ttl: default time to live of an entry in seconds
+        """
+        self._max_items = max_items
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._data: OrderedDict[str, tuple[Any, float, int]] = OrderedDict()
+        self._bytes = 0
+        self._pinned: frozenset[str] = frozenset()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def bytes(self) -> int:
+        """Return the total size of the stored entries."""
+        return self._bytes
+
+    def get(self, key: str) -> Any | None:
+        """Return the value of a key if it is present and not expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int,
+            ttl: int | None = None) -> None:
+        """
+        Store the value and evict the least recently used entries that do
+        not fit into the limits. Pinned entries are evicted last.
+        """
+        if size > self._max_bytes:
+            return
+        self.delete(key)
+        ttl = self._ttl if ttl is None else min(ttl, self._ttl)
+        self._data[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        while len(self._data) > self._max_items or \
+                self._bytes > self._max_bytes:
+            victim = next((k for k in self._data if k not in self._pinned),
+                          None)
+            self.delete(next(iter(self._data)) if victim is None else victim)
+
+    def pin(self, keys: Iterable[str]) -> None:
+        """Replace the set of the keys that are kept over the others."""
+        self._pinned = frozenset(keys)
+
+    def delete(self, key: str) -> None:
+        """Remove the key."""
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Remove all the keys starting with the prefix."""
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            self.delete(key)
+
+    def clear(self) -> None:
+        """Remove all the keys."""
+        self._data.clear()
+        self._bytes = 0
+
+
 class RedisCache(CacheAbstract):
-    """Redis cache class."""
+    """Redis cache class with an optional in-process layer in front."""
 
-    def __init__(self, redis: Redis) -> None:
+    def __init__(self, redis: Redis, local: LocalCache | None = None) -> None:
         self._redis = redis
+        self._local = local
+
+    @property
+    def local(self) -> LocalCache | None:
+        """Return the in-process cache if it is enabled."""
+        return self._local
 
     def client(self) -> Redis | None:
         return self._redis
@@ -45,7 +166,516 @@ class RedisCache(CacheAbstract):
     async def set(self, key: Any, value: Any, *args, **kwargs) -> Any:
         await self._redis.set(key, value, *args, **kwargs)
 
+    async def mget(self, keys: list[Any]) -> list[Any]:
+        """Get the values of the keys in one round trip."""
+        if not keys:
+            return []
+        return await self._redis.mget(*keys)
+
+    async def mset(self, items: dict[Any, Any], expire: int) -> None:
+        """Set the values of the keys with a TTL in one round trip."""
+        if not items:
+            return
+        pipe = self._redis.pipeline()
+        for key, value in items.items():
+            pipe.set(key, value, expire=expire)
+        await pipe.execute()
+
+
+local_cache: LocalCache | None = None
+
+
+async def get_local_cache() -> LocalCache | None:
+    """Return the in-process cache of the worker."""
+    return local_cache
+
+
+##############################################
+#  Codecs
+##############################################
+
+class Codec(abc.ABC):
+    """
+    An encoding of the stored entries.
+
+    The stored value starts with the header byte of its codec, so entries
+    of different codecs can be read side by side while the configuration
+    changes.
+    """
+    name: str
+    header: bytes
+
+    @abc.abstractmethod
+    def encode(self, data: bytes) -> bytes:
+        """Encode the entry."""
+        ...
+
+    @abc.abstractmethod
+    def decode(self, data: bytes) -> bytes:
+        """Decode the entry."""
+        ...
+
+
+class JsonCodec(Codec):
+    """Plain JSON as it is."""
+    name, header = 'json', b'\x00'
+
+    def encode(self, data: bytes) -> bytes:
+        return data
+
+    def decode(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCodec(Codec):
+    """
+    JSON compressed by zlib, optionally with a preset dictionary that
+    primes the compressor with the field names of the models, so that even
+    a short entry compresses well.
+    """
+
+    def __init__(self, name: str, header: bytes, level: int,
+                 zdict: bytes | None = None) -> None:
+        self.name, self.header = name, header
+        self._level = level
+        self._zdict = zdict
+
+    def encode(self, data: bytes) -> bytes:
+        if self._zdict is None:
+            return zlib.compress(data, self._level)
+        compressor = zlib.compressobj(self._level, zdict=self._zdict)
+        return compressor.compress(data) + compressor.flush()
+
+    def decode(self, data: bytes) -> bytes:
+        if self._zdict is None:
+            return zlib.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self._zdict)
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+class LzmaCodec(Codec):
+    """JSON compressed by LZMA: smaller than zlib, slower to encode."""
+    name, header = 'lzma', b'\x02'
+
+    def __init__(self, preset: int) -> None:
+        self._preset = preset
+
+    def encode(self, data: bytes) -> bytes:
+        return lzma.compress(data, format=lzma.FORMAT_XZ,
+                             check=lzma.CHECK_NONE, preset=self._preset)
+
+    def decode(self, data: bytes) -> bytes:
+        return lzma.decompress(data, format=lzma.FORMAT_XZ)
+
+
+def _model_zdict() -> bytes:
+    """
+    Return the preset dictionary of the compact codec.
+
+    Changing it makes the stored compact entries unreadable, they are
+    treated as misses then.
+    """
+    keys = {alias for model in (models.Film, models.Person, models.Genre)
+            for alias in response_fields(model)}
+    fragments = [b'{"headers":{},"fresh_until":,"delta":}\n[{"id":"']
+    fragments += [f',"{key}":'.encode() for key in sorted(keys)]
+    fragments += [b'[{"id":"', b'","name":"', b'"},{"id":"', b'"}]']
+    # zlib prefers the most common strings at the end of the dictionary
+    return b''.join(fragments)
+
+
+CODECS: dict[str, Codec] = {codec.name: codec for codec in (
+    JsonCodec(),
+    ZlibCodec('zlib', b'\x01', settings.CACHE_ZLIB_LEVEL),
+    LzmaCodec(settings.CACHE_LZMA_PRESET),
+    ZlibCodec('compact', b'\x03', settings.CACHE_ZLIB_LEVEL,
+              zdict=_model_zdict()),
+)}
+_BY_HEADER: dict[bytes, Codec] = {codec.header: codec
+                                  for codec in CODECS.values()}
+
+
+def namespace_codec(namespace: str) -> Codec:
+    """Return the codec of the new entries of the namespace."""
+    return CODECS[settings.CACHE_CODECS.get(namespace, settings.CACHE_CODEC)]
+
+
+def encode_entry(codec: Codec, data: bytes) -> bytes:
+    """Encode the entry and count the bytes saved and the time spent."""
+    started = time.perf_counter()
+    raw = codec.header + codec.encode(data)
+    metrics.incr(f'codec.{codec.name}.encode_seconds',
+                 time.perf_counter() - started)
+    metrics.incr(f'codec.{codec.name}.entries')
+    metrics.incr(f'codec.{codec.name}.raw_bytes', len(data))
+    metrics.incr(f'codec.{codec.name}.stored_bytes', len(raw))
+    return raw
+
+
+def decode_entry(raw: bytes) -> bytes | None:
+    """
+    Decode the entry by the codec of its header byte.
+
+    Entries written before the codecs start with the JSON metadata and are
+    returned as they are. An entry that cannot be decoded is None.
+    """
+    if raw[:1] == b'{':
+        return raw
+    codec = _BY_HEADER.get(raw[:1])
+    if codec is None:
+        metrics.incr('codec.unknown')
+        return None
+    started = time.perf_counter()
+    try:
+        data = codec.decode(raw[1:])
+    except (zlib.error, lzma.LZMAError):
+        logger.warning('Failed to decode a %s cache entry', codec.name)
+        metrics.incr(f'codec.{codec.name}.errors')
+        return None
+    metrics.incr(f'codec.{codec.name}.decode_seconds',
+                 time.perf_counter() - started)
+    return data
+
+
+##############################################
+#  Decorator
+##############################################
+
+class CacheEntry(NamedTuple):
+    """A cached response body with its headers and freshness metadata."""
+    body: bytes
+    headers: dict[str, str]
+    fresh_until: float
+    delta: float
+    # Ids of the listed objects of a normalized entry, which has no body
+    ids: list[str] | None = None
+
+    def response(self) -> Response:
+        """Return the entry as a response."""
+        return Response(content=self.body, headers=self.headers,
+                        media_type=JSON_MEDIA_TYPE)
+
+
+def dump_entry(entry: CacheEntry) -> bytes:
+    """Return the entry as a line of JSON metadata followed by the body."""
+    meta = {'headers': entry.headers,
+            'fresh_until': entry.fresh_until,
+            'delta': entry.delta}
+    if entry.ids is not None:
+        meta['ids'] = entry.ids
+    return orjson.dumps(meta) + b'\n' + entry.body
+
+
+def parse_entry(data: bytes) -> CacheEntry:
+    """Return the entry dumped by dump_entry."""
+    meta, _, body = data.partition(b'\n')
+    meta = orjson.loads(meta)
+    return CacheEntry(body, meta['headers'], meta['fresh_until'],
+                      meta['delta'], meta.get('ids'))
+
+
+def redis_cache(
+        model: settings.CINEMA_MODEL,
+        expired: int = 60,
+        namespace: str | None = None,
+        stale: int = 0,
+        early_refresh: float = 0.0,
+        admit_after: int = 0,
+        track: str | None = None,
+        normalize: str | None = None,
+):
+    """
+    A decorator for caching.
+
+    The final response body is cached, so a hit is returned as is without
+    building and validating models. The endpoint may return a Response
+    itself, then its body and headers are cached, unless it is marked with
+    Cache-Control: no-store.
+
+    An entry is fresh for `expired` seconds. After that it is served stale
+    for `stale` more seconds while a background task refreshes it. With
+    `early_refresh` greater than zero hot entries are refreshed before they
+    turn stale (probabilistic early expiration, XFetch); the greater the
+    value, the earlier the refresh.
+
+    With `admit_after` greater than zero a response is stored only once its
+    key has been requested that many times recently (see FrequencySketch),
+    until then it is computed on every request.
+
+    :param model: cinema model of the response
+    :param expired: time in seconds during which the entry is fresh
+    :param namespace: cache namespace, the model name by default
+    :param stale: time in seconds during which the stale entry is served
+    :param early_refresh: XFetch beta, 0 disables early refresh
+    :param admit_after: number of recent requests of the key to store it,
+        0 stores every response
+    :param track: argument with the object id to count the requests of
+        (see AccessCounter), None counts nothing
+    :param normalize: argument with the service of the listed objects; with
+        CACHE_NORMALIZED enabled the entry keeps only their ids and the
+        body is assembled from the cached objects on every hit
+    """
+    namespace = namespace or model.__name__.lower()
+    codec = namespace_codec(namespace)
+
+    def wrap(fn):
+        route = f'{fn.__module__}.{fn.__qualname__}'
+        sketch = FrequencySketch(
+            route, settings.CACHE_ADMISSION_SKETCH_WIDTH,
+            settings.CACHE_ADMISSION_WINDOW_IN_SECONDS,
+        ) if admit_after else None
+
+        @functools.wraps(fn)
+        async def decorated(request: Request, **kwargs):
+            key = build_key(namespace, route, kwargs)
+            redis = await get_redis()
+            read = functools.partial(_read_entry, key, kwargs.get(normalize),
+                                     kwargs.get('fields'))
+            entry = await read()
+            # Stored entries have been admitted already
+            admit = entry is not None or sketch is None or \
+                await sketch.touch(redis, key) >= admit_after
+
+            async def fill():
+                started = time.monotonic()
+                result = await fn(request, **kwargs)
+                return await store(key, kwargs, result, started, admit)
+
+            if entry is None:
+                entry = await coalescer.run(redis, key, fill, read, namespace)
+                if entry is None:
+                    return None
+            elif _should_refresh(entry, early_refresh):
+                metrics.incr(f'cache.{namespace}.stale')
+                coalescer.refresh(redis, key, fill, namespace)
+            else:
+                metrics.incr(f'cache.{namespace}.hit')
+            # Unknown ids raise before, so they are not counted
+            if track is not None:
+                access_counter.record(namespace, kwargs[track], key)
+            return entry.response()
+
+        async def warm(**kwargs) -> bool:
+            """
+            Store the response to the arguments unless it is cached.
+
+            The arguments that are not given take the defaults of the
+            endpoint, dependencies default to None.
+
+            :return: whether the response has been stored
+            """
+            kwargs = {**_endpoint_defaults(fn), **kwargs}
+            key = build_key(namespace, route, kwargs)
+            if await _from_redis_cache(key) is not None:
+                return False
+            started = time.monotonic()
+            result = await fn(_warmup_request(), **kwargs)
+            entry = await store(key, kwargs, result, started)
+            # The entries that are not stored are never fresh
+            return entry is not None and entry.fresh_until > 0
+
+        async def store(key: str, kwargs: dict, result: Any, started: float,
+                        admit: bool = True) -> CacheEntry | None:
+            """
+            Store the endpoint result the way every request does and return
+            its entry, which is not stored if the response is marked with
+            Cache-Control: no-store or is not admitted.
+
+            :param key: cache key
+            :param kwargs: arguments of the endpoint
+            :param result: endpoint result, None stores nothing
+            :param started: monotonic time the endpoint was called at
+            :param admit: whether the admission policy admits the key
+            :return: entry or None
+            """
+            if result is None:
+                return None
+            body, headers = _result_body(result)
+            delta = time.monotonic() - started
+            if headers.get('cache-control') == NO_STORE:
+                metrics.incr(f'cache.{namespace}.no_store')
+                return CacheEntry(body, headers, 0.0, delta)
+            if not admit:
+                metrics.incr(f'cache.{namespace}.rejected')
+                return CacheEntry(body, headers, 0.0, delta)
+            return await _to_redis_cache(
+                key, body, headers, expire_time=expired, stale_time=stale,
+                delta=delta, codec=codec, ids=await normalized(body, kwargs),
+            )
+
+        async def normalized(body: bytes, kwargs: dict) -> list[str] | None:
+            """Store the listed objects and return their ids in normalized
+            mode, return None otherwise."""
+            if normalize is None or not settings.CACHE_NORMALIZED:
+                return None
+            items = orjson.loads(body)
+            # Sparse items cannot stand for the objects
+            if not kwargs.get('fields'):
+                await kwargs[normalize].cache_many(items)
+            return [x['id'] for x in items]
+
+        decorated.warm = warm
+        decorated.defaults = functools.partial(_endpoint_defaults, fn)
+        return decorated
+
+    return wrap
+
+
+def render(data: Any) -> bytes:
+    """
+    Serialize the data the same way FastAPI serializes the response model:
+    all the fields by alias. Documents that are already dicts are written
+    as they are.
+    """
+    return serialization.dumps(data)
+
+
+def json_response(data: Any) -> Response:
+    """Return the data as a response that skips response_model validation."""
+    return Response(content=render(data), media_type=JSON_MEDIA_TYPE)
+
+
+def page_response(page: Page) -> Response:
+    """
+    Return the page as a response with the cursor of the next page. A page
+    that cannot be cached is marked with Cache-Control: no-store, which
+    redis_cache honours too.
+    """
+    response = json_response(page.items)
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if not page.cacheable:
+        response.headers['cache-control'] = NO_STORE
+    return response
+
+
+def _result_body(result: Any) -> tuple[bytes, dict[str, str]]:
+    """Return the body and the headers to cache of the endpoint result."""
+    if isinstance(result, Response):
+        return result.body, _cached_headers(result)
+    return render(result), {}
+
+
+@functools.lru_cache()
+def _endpoint_defaults(fn) -> dict[str, Any]:
+    """Return the default values of the query parameters of the endpoint
+    and None for its dependencies."""
+    defaults = {}
+    for name, parameter in inspect.signature(fn).parameters.items():
+        default = parameter.default
+        if isinstance(default, params.Depends):
+            defaults[name] = None
+        elif isinstance(default, FieldInfo):
+            defaults[name] = None if default.default is ... \
+                else default.default
+        elif default is not parameter.empty:
+            defaults[name] = default
+    defaults.pop('request', None)
+    return defaults
+
+
+def _warmup_request() -> Request:
+    """Return a request to call an endpoint outside of the HTTP server."""
+    return Request({
+        'type': 'http', 'method': 'GET', 'scheme': 'http',
+        'server': ('warmup', 80), 'root_path': '', 'path': '/',
+        'query_string': b'', 'headers': [],
+    })
+
+
+def _cached_headers(response: Response) -> dict[str, str]:
+    """Return the headers of the response that are stored in the cache."""
+    return {name: value for name, value in response.headers.items()
+            if name not in ('content-length', 'content-type')}
+
+
+def _should_refresh(entry: CacheEntry, beta: float) -> bool:
+    """
+    Check whether the entry is stale or should be refreshed early.
+
+    XFetch refreshes the entry with a probability that grows as the expiry
+    approaches and with the time it takes to recompute the entry.
+    """
+    now = time.time()
+    if beta > 0:
+        now -= entry.delta * beta * math.log(1 - random.random())
+    return now >= entry.fresh_until
+
+
+async def _from_redis_cache(key: str) -> CacheEntry | None:
+    """Get the response body from the in-process cache or Redis."""
+    if local_cache is not None:
+        entry = local_cache.get(key)
+        # A stale local entry may have been refreshed by another worker
+        if entry is not None and entry.fresh_until > time.time():
+            return entry
+
+    redis = await get_redis()
+    raw = await redis.get(key)
+
+    if not raw:
+        return None
+    data = decode_entry(raw)
+    if data is None:
+        return None
+
+    entry = parse_entry(data)
+    if local_cache is not None and entry.ids is None:
+        local_cache.set(key, entry, size=len(data))
+    return entry
+
+
+async def _read_entry(key: str,
+                      service: Any = None,
+                      fields: tuple[str, ...] | None = None,
+                      ) -> CacheEntry | None:
+    """
+    Get the response from the cache and assemble the body of a normalized
+    entry from the cached objects, fetching the missing ones.
+
+    :param key: cache key
+    :param service: service of the listed objects
+    :param fields: response fields of the listed objects, all by default
+    :return: entry with the body or None
+    """
+    entry = await _from_redis_cache(key)
+    if entry is None or entry.ids is None:
+        return entry
+    # The entry has been normalized by another configuration
+    if service is None:
+        return None
+    items = await service.get_many_by_ids(entry.ids, track=False)
+    body = render([project(x, fields) for x in items] if fields else items)
+    entry = entry._replace(body=body, ids=None)
+    metrics.incr('cache.normalized.assembled')
+    if local_cache is not None:
+        local_cache.set(key, entry, size=len(body))
+    return entry
+
+
+async def _to_redis_cache(key: str,
+                          body: bytes,
+                          headers: dict[str, str],
+                          expire_time: int,
+                          stale_time: int = 0,
+                          delta: float = 0.0,
+                          codec: Codec = CODECS['json'],
+                          ids: list[str] | None = None) -> CacheEntry:
+    """
+    Store the response body to Redis and the in-process cache.
 
-async def get_redis_extended() -> RedisCache:
+    The entry is a line of JSON metadata followed by the body, encoded by
+    the codec. A normalized entry stores the ids of the listed objects in
+    the metadata instead of the body.
+    """
+    entry = CacheEntry(body, headers, time.time() + expire_time, delta)
+    data = dump_entry(entry)
+    stored = data if ids is None else \
+        dump_entry(entry._replace(body=b'', ids=ids))
     redis = await get_redis()
-    return RedisCache(redis)
+    await redis.set(key, encode_entry(codec, stored),
+                    expire=expire_time + stale_time)
+    if local_cache is not None:
+        local_cache.set(key, entry, size=len(data),
+                        ttl=expire_time + stale_time)
+    return entry
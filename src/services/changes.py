@@ -0,0 +1,118 @@
+"""
+This module applies the change events that the ETL publishes after it
+uploads documents to Elasticsearch.
+
+The ETL drops the cached documents from Redis itself and publishes the
+changed ids chunk by chunk, every worker drops the documents from its
+in-process cache. Once per cycle the ETL bumps the change generation of the
+index, then every worker moves the dependent cache namespaces to the new
+generation, so their old entries are no longer reachable.
+"""
+
+import asyncio
+import logging
+
+import orjson
+from aioredis import Channel, Redis
+
+from src.core import cache_key
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.services import bloom
+from src.services.cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+
+def generations_key() -> str:
+    """Return the key of the hash of the index generations."""
+    return f'{settings.CACHE_KEY_PREFIX}:generations'
+
+
+def set_generation(index: str, generation: int,
+                   local: LocalCache | None = None) -> None:
+    """
+    Move the namespaces that depend on the index to the generation.
+
+    :param index: Elasticsearch index
+    :param generation: change generation of the index
+    :param local: in-process cache of the worker
+    """
+    if generation <= cache_key.generations.get(index, 0):
+        return
+    namespaces = settings.CACHE_INVALIDATION_DEPENDENCIES.get(index, [index])
+    old_prefixes = [cache_key.namespace_prefix(x) for x in namespaces]
+    cache_key.generations[index] = generation
+    if local is not None:
+        for prefix in old_prefixes:
+            local.delete_prefix(prefix)
+
+
+def apply_change(message: bytes, local: LocalCache | None = None) -> None:
+    """
+    Apply the change event of the ETL.
+
+    :param message: JSON with the 'index', changed 'ids' and, once per ETL
+        cycle, the new 'generation' of the index
+    :param local: in-process cache of the worker
+    """
+    try:
+        event = orjson.loads(message)
+        index, ids = event['index'], event['ids']
+        generation = event.get('generation')
+        if generation is not None:
+            generation = int(generation)
+    except (orjson.JSONDecodeError, KeyError, TypeError, ValueError,
+            AttributeError):
+        logger.warning('Malformed change event: %r', message)
+        return
+
+    if generation is not None:
+        set_generation(index, generation, local)
+    if local is not None:
+        for object_id in ids:
+            local.delete(object_id)
+    bloom.add_ids(index, ids)
+    metrics.incr(f'changes.{index}', len(ids))
+
+
+async def load_generations(redis: Redis,
+                           local: LocalCache | None = None) -> None:
+    """
+    Load the index generations, e.g. to catch up with lost events.
+
+    :param redis: Redis connection
+    :param local: in-process cache of the worker
+    """
+    stored = await redis.hgetall(generations_key())
+    for index, generation in stored.items():
+        set_generation(index.decode(), int(generation), local)
+
+
+async def listen_changes(channel: Channel,
+                         local: LocalCache | None = None) -> None:
+    """
+    Apply change events until the channel is closed.
+
+    :param channel: subscribed change channel
+    :param local: in-process cache of the worker
+    """
+    async for message in channel.iter():
+        apply_change(message, local)
+
+
+async def sync_generations(redis: Redis,
+                           local: LocalCache | None = None) -> None:
+    """
+    Reload the index generations periodically until cancelled, so that a
+    worker that missed an event does not serve the old entries for long.
+
+    :param redis: Redis connection
+    :param local: in-process cache of the worker
+    """
+    while True:
+        await asyncio.sleep(settings.CACHE_GENERATIONS_SYNC_IN_SECONDS)
+        try:
+            await load_generations(redis, local)
+        except Exception:
+            logger.exception('Failed to load the cache generations')
@@ -0,0 +1,43 @@
+"""
+This module wires the services of the application once, at startup.
+
+The request dependencies (get_film_service etc.) return the services stored
+in the application state, so a request builds no clients or services.
+"""
+
+from typing import NamedTuple
+
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+
+from src.services.cache import LocalCache, RedisCache
+from src.services.film import FilmService
+from src.services.genre import GenreService
+from src.services.person import PersonService
+from src.services.storage import ElasticStorage
+
+
+class Services(NamedTuple):
+    """The services of the application."""
+    film: FilmService
+    genre: GenreService
+    person: PersonService
+
+
+def build_services(redis: Redis,
+                   es: AsyncElasticsearch,
+                   local: LocalCache | None = None) -> Services:
+    """
+    Build the services that share the connections and the caches.
+
+    :param redis: Redis connection
+    :param es: Elasticsearch connection
+    :param local: in-process cache of the worker
+    :return: services
+    """
+    cache, storage = RedisCache(redis, local), ElasticStorage(es)
+    return Services(
+        film=FilmService(cache, storage),
+        genre=GenreService(cache, storage),
+        person=PersonService(cache, storage),
+    )
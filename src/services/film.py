@@ -2,15 +2,13 @@
 This module contains the asynchronous FilmService.
 """
 
-from functools import lru_cache
-
-from fastapi import Depends
+from fastapi import Request
 
 from src.core.config import settings
 from src.models import Film
 from src.services._service_elt import ELTService
-from src.services.cache import RedisCache, get_redis_extended
-from src.services.storage import ElasticStorage, get_elastic_extended
+
+FILM_SORT = [{'imdb_rating': {'order': 'desc', 'missing': '_last'}}]
 
 
 class FilmService(ELTService):
@@ -27,18 +25,11 @@ class FilmService(ELTService):
         self._model = Film
         self._cache_expire = settings.FILM_CACHE_EXPIRE_IN_SECONDS
         self._index = settings.ES_INDEX_MOVIES
+        self._sort = FILM_SORT
 
 
-@lru_cache()
-def get_film_service(
-        redis: RedisCache = Depends(get_redis_extended),
-        elastic: ElasticStorage = Depends(get_elastic_extended),
-) -> FilmService:
+async def get_film_service(request: Request) -> FilmService:
     """
-    Return the service that retrieves film data as a singleton.
-
-    Due to lru_caching the first call to the function instantiates the service,
-    and all subsequent calls to the function are handled by the same instance
-    of that service.
+    Return the film service that the application has built at startup.
     """
-    return FilmService(redis, elastic)
+    return request.app.state.services.film
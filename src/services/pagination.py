@@ -0,0 +1,57 @@
+"""
+This module contains the opaque cursors for search_after pagination.
+"""
+
+import base64
+import binascii
+from typing import Any, NamedTuple
+
+import orjson
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+CURSOR_DESCRIPTION = (
+    'Cursor of the page. Pass an empty cursor to get the first page, the '
+    f'cursor of the next page is returned in the {NEXT_CURSOR_HEADER} '
+    'header. Page numbers are ignored when the cursor is given.'
+)
+
+
+class PaginationError(ValueError):
+    """The requested page cannot be served."""
+
+
+class Page(NamedTuple):
+    """A page of documents and the cursor of the next page, if any."""
+    items: list
+    next_cursor: str | None = None
+    # The cursor of a point in time expires long before a cache entry
+    cacheable: bool = True
+
+
+def encode_cursor(search_after: list[Any], pit: str | None = None) -> str:
+    """
+    Encode the position after the last document of the page.
+
+    :param search_after: sort values of the last document
+    :param pit: Elasticsearch point in time id
+    :return: opaque cursor
+    """
+    payload = orjson.dumps({'after': search_after, 'pit': pit})
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """
+    Decode the cursor. An empty cursor is the start of the results.
+
+    :param cursor: opaque cursor
+    :return: dict with 'after' sort values and 'pit' id
+    """
+    if not cursor:
+        return {'after': None, 'pit': None}
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = orjson.loads(base64.urlsafe_b64decode(padded))
+        return {'after': position['after'], 'pit': position['pit']}
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError):
+        raise PaginationError(f'Invalid cursor: {cursor}')
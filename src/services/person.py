@@ -3,15 +3,21 @@ This module contains the asynchronous PersonService and its abstract class.
 """
 
 import abc
-from functools import lru_cache
+import asyncio
+import logging
 
-from fastapi import Depends
+import aioredis
+import elasticsearch
+from fastapi import Request
 
 from src.core.config import settings
+from src.core.metrics import metrics
 from src.models import Film, Person
 from src.services._service_elt import ELTService
-from src.services.cache import RedisCache, get_redis_extended
-from src.services.storage import ElasticStorage, get_elastic_extended
+from src.services.film import FILM_SORT
+from src.services.pagination import Page
+
+logger = logging.getLogger(__name__)
 
 
 class PersonServiceAbstract(abc.ABC):
@@ -24,7 +30,10 @@ class PersonServiceAbstract(abc.ABC):
     async def get_films_by_person(self,
                                   person_id: str,
                                   page_size: int,
-                                  page_number: int) -> list[Film]: ...
+                                  page_number: int,
+                                  cursor: str | None = None,
+                                  fields: tuple[str, ...] | None = None,
+                                  ) -> Page: ...
 
 
 class PersonService(ELTService, PersonServiceAbstract):
@@ -42,20 +51,55 @@ class PersonService(ELTService, PersonServiceAbstract):
     async def get_films_by_person(self,
                                   person_id: str,
                                   page_size: int,
-                                  page_number: int) -> list[Film]:
+                                  page_number: int,
+                                  cursor: str | None = None,
+                                  fields: tuple[str, ...] | None = None,
+                                  ) -> Page:
         """
         Return films filtered by person.
 
+        The films are looked up by the 'film_ids' of the (as a rule cached)
+        person document, a person that is not indexed has none. The nested
+        query over the film roles is the fallback for the errors of the
+        cache or the storage only.
+
         :param person_id: person id
         :param page_size: size of the page
         :param page_number: number of the page
-        :return: list of films
+        :param cursor: cursor of the page, an empty one for the first page
+        :param fields: film fields to return, all by default
+        :return: page of films
+        """
+        try:
+            person = await self.get_by_id(person_id, '')
+        except (aioredis.RedisError, OSError, asyncio.TimeoutError,
+                elasticsearch.TransportError):
+            logger.exception('Failed to get the person %s, falling back to '
+                             'the nested query', person_id)
+            metrics.incr('person_films.nested')
+            body = self._nested_films_query(person_id)
+        else:
+            # Unknown persons, also the probed ones, have no films
+            if person is None or not person.film_ids:
+                return Page([])
+            metrics.incr('person_films.ids')
+            body = {'query': {'ids': {'values': person.film_ids}}}
+        return await self._search_page(
+            settings.ES_INDEX_MOVIES, body, page_size, page_number, cursor,
+            FILM_SORT, Film, fields,
+        )
+
+    @staticmethod
+    def _nested_films_query(person_id: str) -> dict:
+        """
+        Return the query of the films where the person has any role.
+
+        :param person_id: person id
+        :return: search body
         """
         roles = ['directors', 'actors', 'writers']
 
         body = {
-            'size': page_size,
-            'from': (page_number - 1) * page_size,
             'query': {
                 'bool': {
                     'should': []
@@ -79,22 +123,11 @@ class PersonService(ELTService, PersonServiceAbstract):
                     }
                 }
             )
-        doc = await self._elastic.search(index=settings.ES_INDEX_MOVIES,
-                                         body=body)
-        films = [Film(**item['_source']) for item in doc['hits']['hits']]
-        return films
+        return body
 
 
-@lru_cache()
-def get_person_service(
-        redis: RedisCache = Depends(get_redis_extended),
-        elastic: ElasticStorage = Depends(get_elastic_extended),
-) -> PersonService:
+async def get_person_service(request: Request) -> PersonService:
     """
-    Return the service that retrieves person data as a singleton.
-
-    Due to lru_caching the first call to the function instantiates the service,
-    and all subsequent calls to the function are handled by the same instance
-    of that service.
+    Return the person service that the application has built at startup.
     """
-    return PersonService(redis, elastic)
+    return request.app.state.services.person
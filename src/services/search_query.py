@@ -0,0 +1,33 @@
+"""
+This module normalizes the full-text search queries.
+
+Queries that Elasticsearch answers the same way are turned into one string,
+so they share the cache entry. The search runs with the normalized query
+too, so a cached response is exactly the response of the query.
+"""
+
+import re
+
+# Operators of simple_query_string besides '+'
+OPERATOR = re.compile(r'[|\-"*()~\\]')
+
+
+def normalize_query(query: str) -> str:
+    """
+    Return the canonical form of a simple_query_string query run with the
+    'and' default operator.
+
+    The text analyzers lowercase the terms, so the query is lowercased the
+    same way (casefold would also rewrite e.g. 'ß' to 'ss').
+    Whitespace is collapsed and the explicit '+' (and) operator is dropped,
+    as it is the default one. When only plain terms are left, they are
+    sorted: the score of the conjunction does not depend on their order.
+
+    :param query: search query
+    :return: normalized query
+    """
+    terms = [term.lstrip('+') for term in query.lower().split()]
+    terms = [term for term in terms if term]
+    if not any(OPERATOR.search(term) for term in terms):
+        terms.sort()
+    return ' '.join(terms)
@@ -0,0 +1,193 @@
+"""
+This module coalesces concurrent cache misses.
+
+Within a worker only one coroutine per key fills the cache, the others
+await its result. Across the workers a short Redis lease lets one worker
+refill the key while the others wait for the value to appear.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable
+
+from aioredis import Redis
+
+from src.core.config import settings
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Run at most one call per key at a time within the worker."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self,
+                 key: str,
+                 fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Call the function or join the call that is already in flight.
+
+        The call runs as a separate task, so a cancelled caller does not
+        cancel it for the others.
+
+        :param key: key of the call
+        :param fn: coroutine function to call
+        :return: result of the call and whether it was shared
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task), shared
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+class RedisLease:
+    """A short lock in Redis that expires on its own."""
+
+    def __init__(self, redis: Redis, key: str,
+                 ttl_ms: int | None = None) -> None:
+        self._redis = redis
+        self._key = f'{settings.CACHE_KEY_PREFIX}:lease:{key}'
+        self._token = uuid.uuid4().hex
+        self._ttl_ms = ttl_ms or settings.CACHE_LEASE_MS
+
+    async def acquire(self) -> bool:
+        """Try to take the lease without waiting."""
+        return bool(await self._redis.set(
+            self._key, self._token,
+            pexpire=self._ttl_ms,
+            exist=Redis.SET_IF_NOT_EXIST,
+        ))
+
+    async def is_held(self) -> bool:
+        """Check whether anybody holds the lease."""
+        return bool(await self._redis.exists(self._key))
+
+    async def release(self) -> None:
+        """Release the lease unless it has expired and been taken by
+        someone else."""
+        await self._redis.eval(RELEASE_SCRIPT, keys=[self._key],
+                               args=[self._token])
+
+
+class Coalescer:
+    """Coalesce cache misses within the worker and across the workers."""
+
+    def __init__(self) -> None:
+        self._flight = SingleFlight()
+        self._background: set[asyncio.Task] = set()
+
+    async def run(self,
+                  redis: Redis,
+                  key: str,
+                  fill: Callable[[], Awaitable[Any]],
+                  peek: Callable[[], Awaitable[Any]],
+                  namespace: str) -> Any:
+        """
+        Fill the missing key once.
+
+        :param redis: Redis connection for the lease
+        :param key: cache key
+        :param fill: coroutine function that computes, stores and returns
+            the value
+        :param peek: coroutine function that reads the value from the cache
+            or returns None
+        :param namespace: cache namespace for the counters
+        :return: the value
+        """
+        result, shared = await self._flight.do(
+            key, lambda: self._fill(redis, key, fill, peek, namespace),
+        )
+        metrics.incr(f'cache.{namespace}.'
+                     f'{"coalesced" if shared else "miss"}')
+        return result
+
+    def refresh(self,
+                redis: Redis,
+                key: str,
+                fill: Callable[[], Awaitable[Any]],
+                namespace: str) -> None:
+        """
+        Refill the key in the background unless it is already being
+        refilled by this or another worker.
+
+        :param redis: Redis connection for the lease
+        :param key: cache key
+        :param fill: coroutine function that computes and stores the value
+        :param namespace: cache namespace for the counters
+        """
+        if key in self._flight:
+            return
+        task = asyncio.create_task(self._flight.do(
+            key, lambda: self._refresh(redis, key, fill, namespace),
+        ))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    @staticmethod
+    async def _refresh(redis: Redis,
+                       key: str,
+                       fill: Callable[[], Awaitable[Any]],
+                       namespace: str) -> None:
+        lease = RedisLease(redis, key)
+        if not await lease.acquire():
+            return
+        try:
+            await fill()
+            metrics.incr(f'cache.{namespace}.refresh')
+        except Exception:
+            logger.exception('Failed to refresh the cache key %s', key)
+        finally:
+            await lease.release()
+
+    @staticmethod
+    async def _fill(redis: Redis,
+                    key: str,
+                    fill: Callable[[], Awaitable[Any]],
+                    peek: Callable[[], Awaitable[Any]],
+                    namespace: str) -> Any:
+        lease = RedisLease(redis, key)
+        if await lease.acquire():
+            try:
+                return await fill()
+            finally:
+                await lease.release()
+
+        # Another worker refills the key, wait a little for its result
+        waited = 0
+        while waited < settings.CACHE_LEASE_WAIT_MS:
+            await asyncio.sleep(settings.CACHE_LEASE_POLL_MS / 1000)
+            waited += settings.CACHE_LEASE_POLL_MS
+            value = await peek()
+            if value is not None:
+                metrics.incr(f'cache.{namespace}.lease_wait')
+                return value
+            if not await lease.is_held():
+                # The holder has finished without storing anything
+                break
+        else:
+            metrics.incr(f'cache.{namespace}.lease_timeout')
+        return await fill()
+
+
+coalescer = Coalescer()
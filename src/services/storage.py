@@ -7,8 +7,6 @@ from typing import Any
 
 from elasticsearch import AsyncElasticsearch
 
-from src.db.elastic import get_elastic
-
 
 class StorageAbstract(abc.ABC):
     """An abstract class for storage with fulltext search interface."""
@@ -36,7 +34,14 @@ class ElasticStorage(StorageAbstract):
         docs = await self._elastic.search(*args, **kwargs)
         return docs
 
+    async def mget(self, *args, **kwargs) -> Any:
+        docs = await self._elastic.mget(*args, **kwargs)
+        return docs
 
-async def get_elastic_extended() -> ElasticStorage:
-    elastic = await get_elastic()
-    return ElasticStorage(elastic)
+    async def open_point_in_time(self, index: str, keep_alive: str) -> str:
+        """Open a point in time of the index and return its id."""
+        # The client of this version has no helper for the PIT API
+        response = await self._elastic.transport.perform_request(
+            'POST', f'/{index}/_pit', params={'keep_alive': keep_alive},
+        )
+        return response['id']
@@ -0,0 +1,134 @@
+"""
+This module records how often the objects are requested.
+
+Requests are counted in memory and flushed to Redis periodically in one
+pipeline, so counting costs no network I/O per request. Redis keeps a sorted
+set of the access counts per namespace and a HyperLogLog of the requested
+ids per day. The most accessed objects are hot: the warm-up fills them and
+the in-process cache keeps them over the others.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING
+
+from aioredis import Redis
+
+from src.core.cache_key import access_key, namespace_prefix
+from src.core.config import settings
+
+if TYPE_CHECKING:
+    # The cache records the accesses, so it cannot be imported here
+    from src.services.cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+
+def unique_key(namespace: str, day: str | None = None) -> str:
+    """
+    Return the key of the HyperLogLog of the ids requested in a day.
+
+    :param namespace: cache namespace, as a rule an Elasticsearch index
+    :param day: day as YYYYMMDD, today by default
+    :return: key
+    """
+    day = day or time.strftime('%Y%m%d', time.gmtime())
+    return f'{access_key(namespace)}:unique:{day}'
+
+
+class AccessCounter:
+    """Access counts of the objects since the last flush."""
+
+    def __init__(self) -> None:
+        self._counts: defaultdict[str, Counter[str]] = defaultdict(Counter)
+        # Cache keys of the responses about the objects since the last
+        # flush, to pin them too
+        self._keys: defaultdict[str, dict[str, set[str]]] = \
+            defaultdict(dict)
+        self._hot_keys: dict[str, dict[str, set[str]]] = {}
+        self.hot: dict[str, list[str]] = {}
+
+    def record(self, namespace: str, object_id: str,
+               key: str | None = None) -> None:
+        """
+        Count a request of the object.
+
+        :param namespace: cache namespace of the object
+        :param object_id: id of the object
+        :param key: cache key of the response about the object
+        """
+        self._counts[namespace][object_id] += 1
+        if key is not None:
+            self._keys[namespace].setdefault(object_id, set()).add(key)
+
+    async def flush(self, redis: Redis,
+                    local: 'LocalCache | None' = None) -> None:
+        """
+        Add the counts to Redis, reload the hot objects and pin them in the
+        in-process cache.
+
+        :param redis: Redis connection
+        :param local: in-process cache of the worker
+        """
+        counts, self._counts = self._counts, defaultdict(Counter)
+        keys, self._keys = self._keys, defaultdict(dict)
+        namespaces = sorted(set(counts) | set(self.hot))
+        pipe = redis.pipeline()
+        for namespace in namespaces:
+            key = access_key(namespace)
+            for object_id, count in counts.get(namespace, {}).items():
+                pipe.zincrby(key, count, object_id)
+            if counts.get(namespace):
+                # Forget the long tail
+                pipe.zremrangebyrank(key, 0, -settings.ACCESS_MAX_KEYS - 1)
+                pipe.pfadd(unique_key(namespace), *counts[namespace])
+                pipe.expire(unique_key(namespace), 2 * 24 * 60 * 60)
+            pipe.zrevrange(key, 0, settings.HOT_KEYS_TOP - 1,
+                           encoding='utf-8')
+        results = await pipe.execute()
+
+        hot = [x for x in results if isinstance(x, list)]
+        self.hot = dict(zip(namespaces, hot))
+        # The keys of the older generations are no longer read
+        self._hot_keys = {}
+        for namespace in namespaces:
+            prefix = f'{namespace_prefix(namespace)}:'
+            self._hot_keys[namespace] = {
+                x: {k for k in keys.get(namespace, {}).get(x, ())
+                    if k.startswith(prefix)}
+                for x in self.hot[namespace]
+            }
+        if local is not None:
+            local.pin(self.pinned())
+
+    def pinned(self) -> set[str]:
+        """Return the in-process cache keys of the hot objects."""
+        pinned = set()
+        for namespace, ids in self.hot.items():
+            pinned.update(ids)
+            for object_id in ids:
+                pinned.update(
+                    self._hot_keys.get(namespace, {}).get(object_id, ()))
+        return pinned
+
+
+access_counter = AccessCounter()
+
+
+async def flush_access_counts(redis: Redis,
+                              local: 'LocalCache | None' = None) -> None:
+    """
+    Flush the access counts every ACCESS_FLUSH_INTERVAL_IN_SECONDS until
+    cancelled.
+
+    :param redis: Redis connection
+    :param local: in-process cache of the worker
+    """
+    while True:
+        await asyncio.sleep(settings.ACCESS_FLUSH_INTERVAL_IN_SECONDS)
+        try:
+            await access_counter.flush(redis, local)
+        except Exception:
+            logger.exception('Failed to flush the access counts')
@@ -114,6 +114,23 @@ def make_get_request(session: aiohttp.ClientSession):
     return inner
 
 
+@pytest_asyncio.fixture
+def make_post_request(session: aiohttp.ClientSession):
+    async def inner(url: str, json_data: dict,
+                    query_data: str | None = None):
+        url = (f'http://{test_settings.service_host}:'
+               f'{test_settings.service_port}'
+               f'/api/v1/{url}')
+        async with session.post(url, json=json_data,
+                                params=query_data) as response:
+            body = await response.json()
+            headers = response.headers
+            status = response.status
+            return HTTPResponse(body=body, headers=headers, status=status)
+
+    return inner
+
+
 @pytest_asyncio.fixture
 def upload_data_to_es_index(create_es_index, es_write_data, storages_clean):
     async def inner(quantity: int,
@@ -20,6 +20,10 @@ class TestSettings(BaseSettings):
 
     service_host: str = Field('127.0.0.1', env='PROJECT_HOST')
     service_port: str = Field('8000', env='PROJECT_PORT')
+    # The application with ES_FAST_PATH enabled
+    fast_path_service_host: str = Field('127.0.0.1',
+                                        env='FAST_PATH_PROJECT_HOST')
+    fast_path_service_port: str = Field('8001', env='FAST_PATH_PROJECT_PORT')
 
 
 test_settings = TestSettings()
@@ -2,8 +2,10 @@
 This module tests API that handles film data.
 """
 
+import asyncio
 import http
 import json
+import time
 
 import pytest
 from tests.functional.models import Film
@@ -73,6 +75,161 @@ class TestFilmApi:
         # Assertions #
         assert len(response.body) == 10
 
+    async def test_cursor_pagination(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            make_get_request,
+            films_factory,
+    ):
+        """Test walking /api/v1/films/ with cursors."""
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_movies)
+
+        quantity = 50
+        films = await upload_data_to_es_index(
+            quantity=quantity,
+            obj_factory=films_factory,
+            index_name=test_settings.es_index_movies,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+
+        # Run #
+        ids, pages, cursor = [], 0, ''
+        while cursor is not None:
+            response = await make_get_request(
+                url='films/',
+                query_data={'page[size]': 20, 'cursor': cursor}
+            )
+            assert response.status == http.HTTPStatus.OK
+            ids.extend(item['id'] for item in response.body)
+            cursor = response.headers.get('X-Next-Cursor')
+            pages += 1
+
+        # Assertions #
+        assert pages == 3
+        assert sorted(ids) == sorted(film.id for film in films)
+
+    async def test_list_cache_key(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            make_get_request,
+            films_factory,
+            redis_client,
+    ):
+        """
+        Test that reordered and defaulted query parameters share one cache
+        entry at /api/v1/films/.
+        """
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_movies)
+
+        quantity = 3
+        _ = await upload_data_to_es_index(
+            quantity=quantity,
+            obj_factory=films_factory,
+            index_name=test_settings.es_index_movies,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+
+        # Run #
+        await make_get_request(url='films/')
+        await make_get_request(
+            url='films/',
+            query_data={'page[number]': 1, 'page[size]': 50}
+        )
+        await make_get_request(
+            url='films/',
+            query_data={'page[size]': 50, 'page[number]': 1}
+        )
+        keys = await redis_client.keys(
+            f'*:{test_settings.es_index_movies}:*')
+
+        # Assertions #
+        assert len(keys) == 1
+
+    async def test_change_event(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            es_write_data,
+            make_get_request,
+            films_factory,
+            redis_client,
+    ):
+        """
+        Test that a change event of the ETL drops the cached film list at
+        /api/v1/films/.
+        """
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_movies)
+
+        quantity = 3
+        _ = await upload_data_to_es_index(
+            quantity=quantity,
+            obj_factory=films_factory,
+            index_name=test_settings.es_index_movies,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+        cached = await make_get_request(url='films/')
+
+        film = films_factory()
+        await es_write_data([film.dict()], test_settings.es_index_movies,
+                            test_settings.es_id_field)
+        generation = time.time_ns() // 1000
+        await redis_client.hset('cinema:generations',
+                                test_settings.es_index_movies, generation)
+        await redis_client.publish('cinema:changes', json.dumps({
+            'event_id': 'test',
+            'index': test_settings.es_index_movies,
+            'ids': [film.id],
+            'generation': generation,
+        }))
+        await asyncio.sleep(0.5)
+
+        # Run #
+        response = await make_get_request(url='films/')
+
+        # Assertions #
+        assert len(cached.body) == quantity
+        assert len(response.body) == quantity + 1
+
+    async def test_sparse_fields(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            make_get_request,
+            films_factory,
+    ):
+        """Test the 'fields' parameter at /api/v1/films/."""
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_movies)
+
+        quantity = 3
+        films = await upload_data_to_es_index(
+            quantity=quantity,
+            obj_factory=films_factory,
+            index_name=test_settings.es_index_movies,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+
+        # Run #
+        listed = await make_get_request(
+            url='films/', query_data={'fields': 'imdb_rating,title'})
+        detail = await make_get_request(
+            url=f'films/{films[0].id}', query_data={'fields': 'title'})
+        unknown = await make_get_request(
+            url='films/', query_data={'fields': 'title,budget'})
+
+        # Assertions #
+        assert listed.status == http.HTTPStatus.OK
+        assert len(listed.body) == quantity
+        for item in listed.body:
+            assert list(item) == ['id', 'title', 'imdb_rating']
+        assert detail.body == {'id': films[0].id, 'title': films[0].title}
+        assert unknown.status == http.HTTPStatus.UNPROCESSABLE_ENTITY
+
     async def test_get_by_id(
             self,
             storages_clean,
@@ -143,3 +300,27 @@ class TestFilmApi:
         # Assertions #
         assert response.status == http.HTTPStatus.NOT_FOUND
         assert response.body == {'detail': 'Film with id test-uid not found'}
+
+    async def test_not_found_cached(
+            self,
+            storages_clean,
+            make_get_request,
+            redis_client,
+    ):
+        """
+        Test that a film that is not found is remembered for a short time at
+        /api/v1/films/{film_id}.
+        """
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_movies)
+
+        # Run #
+        first = await make_get_request(url='films/test-uid')
+        second = await make_get_request(url='films/test-uid')
+        keys = await redis_client.keys(
+            f'*:missing:{test_settings.es_index_movies}:test-uid')
+
+        # Assertions #
+        assert first.status == http.HTTPStatus.NOT_FOUND
+        assert second.status == http.HTTPStatus.NOT_FOUND
+        assert len(keys) == 1
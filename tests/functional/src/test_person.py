@@ -60,6 +60,41 @@ class TestPersonApi:
         assert len(response.body) == quantity
         assert res == expected
 
+    async def test_get_list_cached(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            make_get_request,
+            persons_factory,
+    ):
+        """
+        Test that a cached response at /api/v1/persons/ is the same as the
+        response built from Elasticsearch.
+        """
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_persons)
+
+        quantity = 3
+        persons = await upload_data_to_es_index(
+            quantity=quantity,
+            obj_factory=persons_factory,
+            index_name=test_settings.es_index_persons,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+
+        # Run #
+        first = await make_get_request(url='persons/')
+        second = await make_get_request(url='persons/')
+
+        res = sorted([Person(**i) for i in second.body], key=lambda x: x.id)
+        expected = sorted(persons, key=lambda x: x.id)
+
+        # Assertions #
+        assert second.status == http.HTTPStatus.OK
+        assert second.headers['content-type'] == 'application/json'
+        assert second.body == first.body
+        assert res == expected
+
     async def test_pagination(
             self,
             storages_clean,
@@ -145,6 +180,70 @@ class TestPersonApi:
         # Assertions #
         assert Person(**json.loads(cached.decode('utf-8'))) == target_person
 
+    async def test_get_by_id_cached_alias(
+            self,
+            storages_clean,
+            create_es_index,
+            es_write_data,
+            make_get_request,
+            persons_factory,
+            redis_client,
+    ):
+        """
+        Test that a cached person keeps a name that contains the field name
+        at /api/v1/persons/{person_id}.
+        """
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_persons)
+
+        person = persons_factory(name='full_name Smith')
+        await create_es_index(index_name=test_settings.es_index_persons)
+        await es_write_data([person.dict()], test_settings.es_index_persons,
+                            test_settings.es_id_field)
+        await make_get_request(url=f'persons/{person.id}')
+
+        # Run #
+        cached = await redis_client.get(person.id)
+
+        # Assertions #
+        assert json.loads(cached.decode('utf-8'))['name'] == \
+            'full_name Smith'
+
+    async def test_batch(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            make_get_request,
+            make_post_request,
+            persons_factory,
+            redis_client,
+    ):
+        """Test POST persons by ids at /api/v1/persons/batch."""
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_persons)
+
+        quantity = 4
+        persons = await upload_data_to_es_index(
+            quantity=quantity,
+            obj_factory=persons_factory,
+            index_name=test_settings.es_index_persons,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+        # One person is cached before the batch, the others are not
+        await make_get_request(url=f'persons/{persons[1].id}')
+        ids = [persons[2].id, 'test-uid', persons[1].id, persons[0].id]
+
+        # Run #
+        response = await make_post_request(url='persons/batch',
+                                           json_data={'ids': ids})
+        cached = await redis_client.mget(*(x.id for x in persons))
+
+        # Assertions #
+        assert response.status == http.HTTPStatus.OK
+        assert [Person(**x) for x in response.body] == [
+            persons[2], persons[1], persons[0]]
+        assert [x is not None for x in cached] == [True, True, True, False]
+
     async def test_not_found(
             self,
             make_get_request,
@@ -197,10 +296,12 @@ class TestPersonApi:
             create_es_index,
             es_write_data,
             make_get_request,
+            persons_factory,
     ):
         """Test GET person's films at /api/v1/persons/{person_id}/film/."""
         # Setup #
         await storages_clean(index_name=test_settings.es_index_movies)
+        await storages_clean(index_name=test_settings.es_index_persons)
 
         await create_es_index(index_name=test_settings.es_index_movies)
 
@@ -258,6 +359,11 @@ class TestPersonApi:
 
         await es_write_data(es_data, test_settings.es_index_movies,
                             test_settings.es_id_field)
+        person = persons_factory(id=target_id, name=target_name,
+                                 film_ids=[x['id'] for x in starred])
+        await create_es_index(index_name=test_settings.es_index_persons)
+        await es_write_data([person.dict()], test_settings.es_index_persons,
+                            test_settings.es_id_field)
 
         # Run #
         response = await make_get_request(url=f'persons/{target_id}/film/')
@@ -265,3 +371,69 @@ class TestPersonApi:
         # Assertions #
         assert response.status == http.HTTPStatus.OK
         assert len(response.body) == num_of_films
+
+    async def test_person_films_unknown(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            create_es_index,
+            make_get_request,
+            films_factory,
+    ):
+        """
+        Test GET the films of a person that is not indexed at
+        /api/v1/persons/{person_id}/film/.
+        """
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_persons)
+
+        _ = await upload_data_to_es_index(
+            quantity=3,
+            obj_factory=films_factory,
+            index_name=test_settings.es_index_movies,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+        await create_es_index(index_name=test_settings.es_index_persons)
+
+        # Run #
+        response = await make_get_request(
+            url=f'persons/{faker.Faker().uuid4()}/film/')
+
+        # Assertions #
+        assert response.status == http.HTTPStatus.OK
+        assert response.body == []
+
+    async def test_person_films_by_ids(
+            self,
+            storages_clean,
+            upload_data_to_es_index,
+            create_es_index,
+            es_write_data,
+            make_get_request,
+            films_factory,
+            persons_factory,
+    ):
+        """
+        Test GET person's films by the person's film ids at
+        /api/v1/persons/{person_id}/film/.
+        """
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_persons)
+
+        films = await upload_data_to_es_index(
+            quantity=6,
+            obj_factory=films_factory,
+            index_name=test_settings.es_index_movies,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+        person = persons_factory(film_ids=[x.id for x in films[:4]])
+        await create_es_index(index_name=test_settings.es_index_persons)
+        await es_write_data([person.dict()], test_settings.es_index_persons,
+                            test_settings.es_id_field)
+
+        # Run #
+        response = await make_get_request(url=f'persons/{person.id}/film/')
+
+        # Assertions #
+        assert response.status == http.HTTPStatus.OK
+        assert {x['id'] for x in response.body} == set(person.film_ids)
@@ -0,0 +1,122 @@
+"""
+This module tests that responses follow the published response schema.
+
+The API may return Elasticsearch documents without building response models,
+so the schema is enforced here instead of on every request. The fast path
+(ES_FAST_PATH) is tested on the second application of the test stack.
+"""
+
+import http
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from tests.functional.settings import test_settings
+from tests.functional.utils.models import HTTPResponse
+
+SERVICES = {
+    'models': (test_settings.service_host, test_settings.service_port),
+    'fast_path': (test_settings.fast_path_service_host,
+                  test_settings.fast_path_service_port),
+}
+
+
+@pytest.fixture(params=list(SERVICES))
+def service_url(request) -> str:
+    """Return the URL of the application with and without the fast path."""
+    host, port = SERVICES[request.param]
+    return f'http://{host}:{port}'
+
+
+@pytest_asyncio.fixture
+def make_get_request(session: aiohttp.ClientSession, service_url: str):
+    async def inner(url: str, query_data: dict | None = None):
+        async with session.get(f'{service_url}/api/v1/{url}',
+                               params=query_data) as response:
+            body = await response.json()
+            return HTTPResponse(body=body, headers=response.headers,
+                                status=response.status)
+
+    return inner
+
+
+async def get_schema(session: aiohttp.ClientSession,
+                     service_url: str, name: str) -> dict:
+    """Return the OpenAPI schema of the model."""
+    async with session.get(f'{service_url}/api/openapi.json') as response:
+        body = await response.json()
+    return body['components']['schemas'][name]
+
+
+def assert_matches(items: list[dict], schema: dict) -> None:
+    """Check that the items have exactly the fields of the schema."""
+    for item in items:
+        assert set(item) == set(schema['properties'])
+        for field in schema.get('required', []):
+            assert item[field] is not None
+
+
+@pytest.mark.asyncio
+class TestResponseSchema:
+    """Test that responses follow the response models."""
+
+    async def test_films(
+            self,
+            session,
+            service_url,
+            storages_clean,
+            upload_data_to_es_index,
+            make_get_request,
+            films_factory,
+    ):
+        """Test films at /api/v1/films/ and /api/v1/films/search/."""
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_movies)
+
+        films = await upload_data_to_es_index(
+            quantity=3,
+            obj_factory=films_factory,
+            index_name=test_settings.es_index_movies,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+        schema = await get_schema(session, service_url, 'Film')
+
+        # Run #
+        listed = await make_get_request(url='films/')
+        found = await make_get_request(url='films/search/',
+                                       query_data={'query': films[0].title})
+
+        # Assertions #
+        assert listed.status == http.HTTPStatus.OK
+        assert found.status == http.HTTPStatus.OK
+        assert len(found.body) > 0
+        assert_matches(listed.body, schema)
+        assert_matches(found.body, schema)
+
+    async def test_persons(
+            self,
+            session,
+            service_url,
+            storages_clean,
+            upload_data_to_es_index,
+            make_get_request,
+            persons_factory,
+    ):
+        """Test persons at /api/v1/persons/."""
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_persons)
+
+        _ = await upload_data_to_es_index(
+            quantity=3,
+            obj_factory=persons_factory,
+            index_name=test_settings.es_index_persons,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+        schema = await get_schema(session, service_url, 'Person')
+
+        # Run #
+        response = await make_get_request(url='persons/')
+
+        # Assertions #
+        assert response.status == http.HTTPStatus.OK
+        assert_matches(response.body, schema)
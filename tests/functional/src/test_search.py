@@ -64,3 +64,41 @@ async def test_search(
     # Assertions #
     assert response.status == expected_answer.get('status')
     assert len(response.body) == expected_answer.get('length')
+
+
+@pytest.mark.asyncio
+async def test_search_cache(
+        storages_clean,
+        es_write_data,
+        make_get_request,
+        redis_client):
+    """
+    Test that equivalent queries share one cache entry at films/search/,
+    which is stored once the query is requested again.
+    """
+    # Setup #
+    await storages_clean(index_name=test_settings.es_index_movies)
+
+    f = faker.Faker()
+    es_data = [{
+        'id': f.uuid4(),
+        'imdb_rating': 5.0,
+        'title': f'The Star {f.word()}',
+        'description': f.text(max_nb_chars=100),
+    } for _ in range(5)]
+    await es_write_data(es_data, test_settings.es_index_movies,
+                        test_settings.es_id_field)
+    pattern = f'*:{test_settings.es_index_movies}:*'
+
+    # Run #
+    first = await make_get_request('films/search/', {'query': 'The  STAR'})
+    keys_after_first = await redis_client.keys(pattern)
+    second = await make_get_request('films/search/', {'query': 'star +the'})
+    keys_after_second = await redis_client.keys(pattern)
+
+    # Assertions #
+    assert first.status == http.HTTPStatus.OK
+    assert len(first.body) == len(es_data)
+    assert second.body == first.body
+    assert keys_after_first == []
+    assert len(keys_after_second) == 1
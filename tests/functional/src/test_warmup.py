@@ -0,0 +1,55 @@
+"""
+This module tests the cache warm-up CLI.
+"""
+
+import argparse
+
+import pytest
+from tests.functional.settings import test_settings
+
+import warmup
+
+
+@pytest.mark.asyncio
+class TestWarmup:
+    """Test the cache warm-up CLI."""
+
+    async def test_cli_stores_entries(
+            self,
+            storages_clean,
+            create_es_index,
+            upload_data_to_es_index,
+            redis_client,
+            genres_factory,
+    ):
+        """Test that the CLI stores the responses in Redis."""
+        # Setup #
+        await storages_clean(index_name=test_settings.es_index_genres)
+        for index_name in (test_settings.es_index_movies,
+                           test_settings.es_index_persons):
+            await storages_clean(index_name=index_name)
+            await create_es_index(index_name=index_name)
+
+        quantity = 3
+        _ = await upload_data_to_es_index(
+            quantity=quantity,
+            obj_factory=genres_factory,
+            index_name=test_settings.es_index_genres,
+            es_id_field=test_settings.es_id_field
+        ).__anext__()
+
+        # Run #
+        result = await warmup.main(argparse.Namespace(
+            list_pages=1, top_details=1, concurrency=2,
+        ))
+
+        # Assertions #
+        assert result['failed'] == 0
+        # The genre list page and the genre details at least
+        assert result['stored'] >= quantity + 1
+        assert len(await redis_client.keys('*')) >= result['stored']
+
+        # Teardown #
+        for index_name in (test_settings.es_index_movies,
+                           test_settings.es_index_persons):
+            await storages_clean(index_name=index_name)
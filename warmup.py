@@ -0,0 +1,54 @@
+"""
+Warm up the response cache, e.g. after a deploy or a Redis flush.
+
+    python warmup.py --list-pages 3 --top-details 100
+"""
+import argparse
+import asyncio
+from collections import Counter
+
+import aioredis
+from elasticsearch import AsyncElasticsearch
+
+from src.api.v1.warmup import warm_up
+from src.core.config import settings
+from src.db import elastic
+from src.db import redis as redis_db
+from src.services import changes
+
+
+async def main(args: argparse.Namespace) -> Counter:
+    redis = await aioredis.create_redis_pool(
+        (settings.REDIS_HOST, settings.REDIS_PORT)
+    )
+    # The cached routes read and write through the application connection
+    redis_db.redis = redis
+    es = AsyncElasticsearch(
+        hosts=[f'{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}'],
+        serializer=elastic.OrjsonSerializer(),
+    )
+    try:
+        # The keys carry the current change generations
+        await changes.load_generations(redis)
+        result = await warm_up(redis, es,
+                               list_pages=args.list_pages,
+                               top_details=args.top_details,
+                               concurrency=args.concurrency)
+        print(', '.join(f'{k}: {v}' for k, v in sorted(result.items())))
+        return result
+    finally:
+        redis_db.redis = None
+        redis.close()
+        await redis.wait_closed()
+        await es.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--list-pages', type=int,
+                        default=settings.WARMUP_LIST_PAGES)
+    parser.add_argument('--top-details', type=int,
+                        default=settings.WARMUP_TOP_DETAILS)
+    parser.add_argument('--concurrency', type=int,
+                        default=settings.WARMUP_CONCURRENCY)
+    asyncio.run(main(parser.parse_args()))